@@ -17,14 +17,20 @@ if sys.platform == "win32":
 
 from ._core import (
     analyze,
+    analyze_channels,
+    analyze_multires,
+    analyze_peaks,
     kaiserWindowLength,
     read_sdif,
+    iter_sdif,
     newPartialList,
     read_aiff,
     synthesize,
+    track,
     estimatef0,
     meancol,
     meancolw,
+    partials_eval,
 )
 from . import util
 from .util import write_sdif
@@ -1,4 +1,4 @@
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 import numpy as np
 import logging
 logger: logging.Logger
@@ -29,9 +29,58 @@ def analyze(samples: np.ndarray,
             croptime: float = -1,
             residuebw: float = 1,
             convergencebw: float = -1,
-            outfile: str = None
+            outfile: str = None,
+            gate: Optional[float] = None,
+            maxfreq: float = 0
             ) -> list[np.ndarray]: ...
 
+def analyze_channels(samples: np.ndarray,
+                     sr: float,
+                     resolution: float,
+                     windowsize: float = -1,
+                     hoptime: float = -1,
+                     freqdrift: float = -1,
+                     sidelobe: float = -1,
+                     ampfloor: float = -90,
+                     croptime: float = -1,
+                     residuebw: float = -1,
+                     convergencebw: float = -1,
+                     gate: Optional[float] = None,
+                     maxfreq: float = 0,
+                     workers: int = 0,
+                     labelled: bool = False
+                     ) -> list[list[np.ndarray]] | tuple[list[np.ndarray], list[int]]: ...
+
+def analyze_multires(samples: np.ndarray,
+                     sr: float,
+                     bands: list[tuple[float, float, float, float]],
+                     sidelobe: float = -1,
+                     ampfloor: float = -90,
+                     residuebw: float = -1,
+                     convergencebw: float = -1,
+                     gate: Optional[float] = None,
+                     workers: int = 0
+                     ) -> list[np.ndarray]: ...
+
+def analyze_peaks(samples: np.ndarray,
+                  sr: float,
+                  resolution: float,
+                  windowsize: float = -1,
+                  hoptime: float = -1,
+                  sidelobe: float = -1,
+                  ampfloor: float = -90,
+                  croptime: float = -1,
+                  residuebw: float = -1,
+                  convergencebw: float = -1,
+                  gate: Optional[float] = None,
+                  maxfreq: float = 0
+                  ) -> tuple[np.ndarray, np.ndarray]: ...
+
+def track(peaks: np.ndarray,
+          offsets: np.ndarray,
+          freqdrift: float
+          ) -> list[np.ndarray]: ...
+
 def estimatef0(partials: list[np.ndarray],
                minfreq: float,
                maxfreq: float,
@@ -45,13 +94,38 @@ def kaiserWindowLength(width: float,
 
 def meancol(X: np.ndarray, col: int) -> float: ...
 def meancolw(X: np.ndarray, col: int, colw: int) -> float: ...
+def partials_stats(partials: list[np.ndarray]) -> np.ndarray: ...
+def partials_eval(partials: list[np.ndarray],
+                  times: np.ndarray,
+                  extend: bool = False,
+                  sparse: bool = False,
+                  phase: bool = False,
+                  workers: int = 1,
+                  dtype: str = 'float64'
+                  ) -> tuple[np.ndarray, ...]: ...
 def newPartialList(partials: list[np.ndarray], labels: Optional[list[int]] = None
                    ) -> PartialListW: ...
-def read_aiff(path: str) -> tuple[np.ndarray, int]: ...
-def read_sdif(path: str) -> tuple[list[np.ndarray], list[int]]: ...
+def iter_sdif(path: str,
+              t0: float = 0.,
+              t1: float = 0.,
+              labels: Optional[list[int]] = None,
+              minamp: float = -120
+              ) -> Iterator[tuple[np.ndarray, int]]: ...
+def read_aiff(path: str,
+              start: int = 0,
+              end: int = 0,
+              channels: int | list[int] | None = None
+              ) -> tuple[np.ndarray, float]: ...
+def read_sdif(path: str,
+              t0: float = 0.,
+              t1: float = 0.,
+              labels: Optional[list[int]] = None,
+              minamp: float = -120
+              ) -> tuple[list[np.ndarray], list[int]]: ...
 def synthesize(partials: list[np.ndarray],
                samplerate: int,
                fadetime: float = -1,
                start: float = -1,
-               end: float = -1
+               end: float = -1,
+               noise: str = 'exact'
                ) -> np.ndarray: ...
@@ -7,14 +7,18 @@ from libcpp.string cimport string
 from libcpp.vector cimport vector
 cimport lorisdefs as loris
 cimport cython
+from cython cimport floating
 from cython.operator cimport dereference as deref, preincrement as inc
 import numpy as np
 cimport numpy as _np
 from numpy.math cimport INFINITY
-from libc.math cimport ceil, sqrt, pi, pow
+from libc.math cimport ceil, sqrt, pi, pow, ldexp
+from libc.stdint cimport uint32_t, uint64_t, int16_t, int32_t, int64_t
+from libc.string cimport memcpy
 import logging
 import sys
 import os
+import numbers
 
 
 ctypedef _np.float64_t SAMPLE_t
@@ -24,11 +28,203 @@ logger = logging.getLogger("loristrck")
 _np.import_array()
 
 
-def analyze(double[::1] samples not None, double sr, double resolution, double windowsize= -1,
+# ------------------------------------------------------------------
+# The samples to analyze are read by loris in blocks, as the analysis
+# window advances, and converted to double on the fly. This allows
+# to analyze float32, int16 and int32 arrays, contiguous or not,
+# without a float64 copy of the whole input
+# ------------------------------------------------------------------
+
+cdef enum:
+    SAMPLES_FLOAT64 = 0
+    SAMPLES_FLOAT32 = 1
+    SAMPLES_INT16 = 2
+    SAMPLES_INT32 = 3
+
+
+ctypedef struct _SampleBuffer:
+    const char *data
+    Py_ssize_t stride
+    int kind
+    double scale
+
+
+cdef void _read_samples(void *data, long start, long count, double *out) noexcept nogil:
+    cdef _SampleBuffer *buf = <_SampleBuffer *>data
+    cdef const char *p = buf.data + start * buf.stride
+    cdef Py_ssize_t stride = buf.stride
+    cdef long i
+    if buf.kind == SAMPLES_FLOAT64:
+        for i in range(count):
+            out[i] = (<const double *>(p + i*stride))[0]
+    elif buf.kind == SAMPLES_FLOAT32:
+        for i in range(count):
+            out[i] = (<const float *>(p + i*stride))[0]
+    elif buf.kind == SAMPLES_INT16:
+        for i in range(count):
+            out[i] = (<const int16_t *>(p + i*stride))[0] * buf.scale
+    else:
+        for i in range(count):
+            out[i] = (<const int32_t *>(p + i*stride))[0] * buf.scale
+
+
+_samplekinds = {
+    np.dtype('float64'): (SAMPLES_FLOAT64, 1.),
+    np.dtype('float32'): (SAMPLES_FLOAT32, 1.),
+    np.dtype('int16'): (SAMPLES_INT16, 2.**-15),
+    np.dtype('int32'): (SAMPLES_INT32, 2.**-31),
+}
+
+
+cdef _SampleBuffer _samplebuffer(_np.ndarray arr):
+    """ arr must have one of the dtypes in _samplekinds """
+    cdef _SampleBuffer buf
+    buf.kind, buf.scale = _samplekinds[arr.dtype]
+    buf.data = <const char *>_np.PyArray_DATA(arr)
+    buf.stride = arr.strides[0]
+    return buf
+
+
+# ------------------------------------------------------------------
+# Decimation, for analyses limited to a low frequency band (maxfreq).
+# The samples are filtered by a linear phase (kaiser windowed sinc)
+# low pass, centered on the output samples, so that times and phases
+# are preserved. Components between maxfreq and the new nyquist
+# frequency can alias, as long as they fold above maxfreq, where
+# the analysis discards them
+# ------------------------------------------------------------------
+
+cdef void _decimate(_SampleBuffer *buf, long numsamples, const double *h, long numtaps,
+                    long q, double *x, long blocklen, double *out, long numout) noexcept nogil:
+    """
+    out[m] = sum(h[k] * x[m*q - numtaps//2 + k]), x being 0 outside [0, numsamples).
+    The samples are read in blocks into x, which has room for blocklen >= numtaps samples
+    """
+    cdef long half = (numtaps - 1) // 2
+    cdef long blockout = (blocklen - numtaps) // q + 1
+    cdef long m0 = 0, m1, m, first, last, lo, hi, i, k
+    cdef const double *p
+    cdef double acc
+    while m0 < numout:
+        m1 = min(m0 + blockout, numout)
+        # input samples [first, last) are needed for the outputs [m0, m1)
+        first = m0 * q - half
+        last = (m1 - 1) * q + half + 1
+        lo = max(first, 0)
+        hi = max(min(last, numsamples), lo)
+        for i in range(first, lo):
+            x[i - first] = 0.
+        _read_samples(buf, lo, hi - lo, x + (lo - first))
+        for i in range(hi, last):
+            x[i - first] = 0.
+        for m in range(m0, m1):
+            p = x + (m - m0) * q
+            acc = 0.
+            for k in range(numtaps):
+                acc += h[k] * p[k]
+            out[m] = acc
+        m0 = m1
+
+
+def _lowpass_kernel(double sr, int q, double maxfreq, double atten):
+    """
+    Kaiser windowed sinc to decimate by q, flat up to maxfreq and attenuating
+    by atten dB the components which would alias below maxfreq
+    """
+    newsr = sr / q
+    # transition band, from maxfreq to newsr - maxfreq
+    width = (newsr - 2 * maxfreq) / sr
+    numtaps = int(np.ceil((atten - 7.95) / (14.36 * width))) | 1
+    beta = 0.1102 * (atten - 8.7) if atten > 50 else 0.5842 * (atten - 21)**0.4 + 0.07886 * (atten - 21)
+    cutoff = newsr / 2 / sr
+    n = np.arange(numtaps) - (numtaps - 1) // 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(numtaps, beta)
+    return h / h.sum()
+
+
+def _decimate_samples(samples, double sr, int q, double maxfreq, double atten):
+    """ Low pass and decimate samples by q, returns a float64 array """
+    cdef _SampleBuffer buf = _samplebuffer(samples)
+    cdef const double[::1] h = _lowpass_kernel(sr, q, maxfreq, atten)
+    cdef long numsamples = len(samples)
+    cdef long numout = (numsamples + q - 1) // q
+    cdef long blocklen = max(1 << 16, 2 * h.shape[0] + q)
+    cdef double[::1] x = np.empty(blocklen, dtype=float)
+    out = np.empty(numout, dtype=float)
+    cdef double[::1] outview = out
+    if numout > 0:
+        with nogil:
+            _decimate(&buf, numsamples, &h[0], h.shape[0], q, &x[0], blocklen,
+                      &outview[0], numout)
+    return out
+
+
+def _analysis_samples(samples, double sr, double maxfreq, double ampfloor):
+    """
+    Check the samples to analyze, decimating them if maxfreq allows it.
+    Returns a tuple (samples, sr)
+    """
+    samples = np.asarray(samples)
+    if samples.ndim != 1:
+        raise ValueError(f"Expected a 1D array of samples, got shape {samples.shape}")
+    if samples.dtype not in _samplekinds:
+        samples = samples.astype(float)
+    cdef int decimation = int(sr / (2.2 * maxfreq)) if maxfreq > 0 else 1
+    if decimation >= 2:
+        # the stopband should push aliasing components below the amplitude floor
+        samples = _decimate_samples(samples, sr, decimation, maxfreq,
+                                    atten=max(-ampfloor, 50) + 10)
+        sr /= decimation
+        logger.info(f"analysis: decimating by {decimation}, sr={sr}Hz")
+    return samples, sr
+
+
+cdef loris.Analyzer* _new_analyzer(double sr, double resolution, double windowsize,
+                                   double hoptime, double freqdrift, double sidelobe,
+                                   double ampfloor, double croptime, double residuebw,
+                                   double convergencebw, gate, double maxfreq) except NULL:
+    """ Create an Analyzer configured with the parameters of analyze """
+    cdef double gatemargin = gate if gate is not None else 0
+    if windowsize < 0:
+        windowsize = resolution * 2  # original Loris behaviour
+    cdef loris.Analyzer* an = new loris.Analyzer(resolution, windowsize)
+    if hoptime > 0:
+        logger.debug("Setting hoptime for Analyzer: {0}".format(hoptime))
+        an.setHopTime(hoptime)
+    if freqdrift > 0:
+        an.setFreqDrift(freqdrift)
+    if sidelobe > 0:
+        an.setSidelobeLevel( sidelobe )
+    if croptime > 0:
+        an.setCropTime( croptime )
+    an.setAmpFloor(ampfloor)
+    if residuebw >= 0:
+        if convergencebw >= 0:
+            logger.error("Only one of residuebw or convergencebw can be set, not both")
+        an.storeResidueBandwidth(residuebw)
+    elif convergencebw >= 0:
+        an.storeConvergenceBandwidth(convergencebw)
+    if maxfreq > 0:
+        an.setFreqCeiling(maxfreq)
+    if gate is not None:
+        an.setSilenceGate(gatemargin)
+
+    cdef int winSamples = kaiserWindowLength(an.windowWidth(), sr, an.sidelobeLevel())
+    logger.info(f"analysis: windowsize={an.windowWidth()}Hz ({winSamples} samples), hop={int(an.hopTime()*1000)}ms, freqdrift={an.freqDrift()}Hz")
+    return an
+
+
+cdef _log_gated(loris.Analyzer* an, long numsamples, double sr):
+    hopsamples = max(int(an.hopTime() * sr), 1)
+    logger.info(f"analysis: silence gate skipped {an.gatedFrames()} of "
+                f"{-(-numsamples // hopsamples)} frames")
+
+
+def analyze(samples, double sr, double resolution, double windowsize= -1,
             double hoptime =-1, double freqdrift =-1, double sidelobe=-1,
             double ampfloor=-90, double croptime=-1,
             double residuebw=-1, double convergencebw=-1,
-            outfile=None):
+            outfile=None, gate=None, double maxfreq=0):
     """
     Partial Tracking Analysis
 
@@ -43,7 +239,10 @@ def analyze(double[::1] samples not None, double sr, double resolution, double w
     - independent parameters (bw region width and amp floor)
 
     Args:
-        samples: numpy.ndarray. An array representing a mono sndfile.
+        samples: numpy.ndarray. An array representing a mono sndfile. It can be
+            float64, float32, int16 or int32 (integer samples are scaled to the
+            range [-1, 1]) and does not need to be contiguous. Samples are
+            converted as the analysis advances, no float64 copy is made
         sr: int (Hz). The sampling rate
         resolution: Hz. Only one partial will be found within this distance.
             Usual values range from 30 Hz to 200 Hz. As a rule of thumb, when tracking a
@@ -79,6 +278,17 @@ def analyze(double[::1] samples not None, double sr, double resolution, double w
             before saturating. This range is mapped to bandwidth values on
             the range [0,1].
             **NB**: one can set residuebw or convergencebw, but not both
+        gate: dB. If given, frames which are too quiet to hold any breakpoint louder
+            than `ampfloor - gate` are not analyzed (partials end there, as they
+            would otherwise). With gate >= 0 the result is the same as without gating
+            and only the time spent on silence is saved. Negative values gate more
+            frames, at the cost of losing the quietest breakpoints. The number of
+            frames skipped is logged (at level INFO)
+        maxfreq: Hz. If given, only partials below this frequency are tracked. If
+            the sampling rate is high enough compared to maxfreq, the samples are
+            low-pass filtered and decimated before the analysis, which makes windows
+            and FFTs shorter. Times and frequencies of the partials are not affected
+            (the hop is rounded to the decimated rate)
 
     Returns:
         a list of numpy 2D arrays, where each array represents a partial. Any such array
@@ -86,33 +296,18 @@ def analyze(double[::1] samples not None, double sr, double resolution, double w
         partial, each breakpoint consists of 5 values: time, freq, amplitude, phase and bandwidth
 
     """
-    if windowsize < 0:
-        windowsize = resolution * 2  # original Loris behaviour
-    cdef loris.Analyzer* an = new loris.Analyzer(resolution, windowsize)
-    if hoptime > 0:
-        logger.debug("Setting hoptime for Analyzer: {0}".format(hoptime))
-        an.setHopTime(hoptime)
-    if freqdrift > 0:
-        an.setFreqDrift(freqdrift)
-    if sidelobe > 0:
-        an.setSidelobeLevel( sidelobe )
-    if croptime > 0:
-        an.setCropTime( croptime )
-    an.setAmpFloor(ampfloor)
-    if residuebw >= 0:
-        if convergencebw >= 0:
-            logger.error("Only one of residuebw or convergencebw can be set, not both")
-        an.storeResidueBandwidth(residuebw)
-    elif convergencebw >= 0:
-        an.storeConvergenceBandwidth(convergencebw)
-
-    cdef int winSamples = kaiserWindowLength(an.windowWidth(), sr, an.sidelobeLevel())
-    logger.info(f"analysis: windowsize={an.windowWidth()}Hz ({winSamples} samples), hop={int(an.hopTime()*1000)}ms, freqdrift={an.freqDrift()}Hz")
-
-    cdef double *samples_begin = &(samples[0])              #<double*> _np.PyArray_DATA(samples)
-    cdef double *samples_end = &(samples[<int>(samples.size-1)]) #samples0 + <int>(samples.size - 1)
-    an.analyze(samples_begin, samples_end, sr)
+    samples, sr = _analysis_samples(samples, sr, maxfreq, ampfloor)
+    cdef loris.Analyzer* an = _new_analyzer(sr, resolution, windowsize, hoptime, freqdrift,
+                                            sidelobe, ampfloor, croptime, residuebw,
+                                            convergencebw, gate, maxfreq)
+    cdef _SampleBuffer buf = _samplebuffer(samples)
+    # The last sample is not analyzed, as it has always been the case
+    cdef long numsamples = max(len(samples) - 1, 0)
+    with nogil:
+        an.analyze(_read_samples, &buf, numsamples, sr)
     cdef loris.PartialList partials = an.partials()
+    if gate is not None:
+        _log_gated(an, numsamples, sr)
     # cdef loris.PartialList partials = an.analyze(samples_begin, samples_end, sr)
     del an
     cdef loris.SdifFile* sdiffile
@@ -129,6 +324,450 @@ def analyze(double[::1] samples not None, double sr, double resolution, double w
     return out
 
 
+
+def analyze_channels(samples, double sr, double resolution, double windowsize=-1,
+                     double hoptime=-1, double freqdrift=-1, double sidelobe=-1,
+                     double ampfloor=-90, double croptime=-1,
+                     double residuebw=-1, double convergencebw=-1,
+                     gate=None, double maxfreq=0, int workers=0, bint labelled=False):
+    """
+    Partial Tracking Analysis of each channel of a multichannel signal
+
+    Each channel is analyzed as a strided view of the interleaved samples, no
+    per-channel copy is made. The analyses run concurrently in a thread pool:
+    the GIL is released while loris analyzes a channel.
+
+    Args:
+        samples: numpy.ndarray. A 2D array of shape (numframes, numchannels), as
+            returned by `util.sndread`. It can be float64, float32, int16 or int32
+            (see `analyze`)
+        sr: int (Hz). The sampling rate
+        resolution, windowsize, hoptime, freqdrift, sidelobe, ampfloor, croptime,
+            residuebw, convergencebw, gate, maxfreq: analysis parameters, see `analyze`
+        workers: the number of channels analyzed at the same time. If 0, one
+            per channel, up to the number of cpus
+        labelled: if True, return all partials as one list, together with a list
+            of labels where the label of each partial is the index of the channel
+            it was found in
+
+    Returns:
+        if labelled is False, a list with one list of partials per channel. Otherwise,
+        a tuple (partials, labels)
+
+    """
+    samples = np.asarray(samples)
+    if samples.ndim != 2:
+        raise ValueError(f"Expected a 2D array of shape (numframes, numchannels), "
+                         f"got shape {samples.shape}")
+    numchannels = samples.shape[1]
+    if workers <= 0:
+        workers = min(numchannels, os.cpu_count() or 1)
+
+    def analyzechannel(chan):
+        return analyze(samples[:, chan], sr, resolution, windowsize=windowsize,
+                       hoptime=hoptime, freqdrift=freqdrift, sidelobe=sidelobe,
+                       ampfloor=ampfloor, croptime=croptime, residuebw=residuebw,
+                       convergencebw=convergencebw, gate=gate, maxfreq=maxfreq)
+
+    if workers <= 1 or numchannels < 2:
+        channels = [analyzechannel(chan) for chan in range(numchannels)]
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            channels = list(pool.map(analyzechannel, range(numchannels)))
+    if not labelled:
+        return channels
+    partials = [p for chanpartials in channels for p in chanpartials]
+    labels = [chan for chan, chanpartials in enumerate(channels) for _ in chanpartials]
+    return partials, labels
+
+
+def _analyze_band(samples, double sr, double minfreq, double maxfreq, double resolution,
+                  double windowsize, double sidelobe, double ampfloor, double residuebw,
+                  double convergencebw, gate):
+    """
+    Analyze the partials within [minfreq, maxfreq]. maxfreq is 0 for no upper
+    limit. Returns a tuple (partials, hoptime, freqdrift)
+    """
+    samples, sr = _analysis_samples(samples, sr, maxfreq, ampfloor)
+    cdef loris.Analyzer* an = _new_analyzer(sr, resolution, windowsize, -1, -1,
+                                            sidelobe, ampfloor, -1, residuebw,
+                                            convergencebw, gate, maxfreq)
+    if minfreq > an.freqFloor():
+        an.setFreqFloor(minfreq)
+    cdef _SampleBuffer buf = _samplebuffer(samples)
+    # The last sample is not analyzed, as in analyze
+    cdef long numsamples = max(len(samples) - 1, 0)
+    with nogil:
+        an.analyze(_read_samples, &buf, numsamples, sr)
+    if gate is not None:
+        _log_gated(an, numsamples, sr)
+    hoptime, freqdrift = an.hopTime(), an.freqDrift()
+    out = PartialList_toarray(&an.partials())
+    del an
+    return out, hoptime, freqdrift
+
+
+def _drop_edge_duplicates(bands, results):
+    """
+    Remove the breakpoints tracked by both bands at a shared edge
+
+    Near an edge the same component can be found at the same time by the
+    analyses of both bands. A breakpoint within freqdrift of the edge is
+    dropped if a longer partial of the neighbouring band (the one of the
+    lower band if both have the same duration) is present at its time,
+    within freqdrift of its frequency. Partials are split where breakpoints
+    are dropped, pieces with less than two breakpoints are discarded.
+
+    Args:
+        bands: a list of (minfreq, maxfreq) per band
+        results: a list of (partials, hoptime, freqdrift) per band, as
+            returned by _analyze_band
+
+    Returns:
+        a tuple (results, numdropped), where results have the same format
+        as the input
+    """
+    bandpartials = [list(result[0]) for result in results]
+    numdropped = 0
+
+    def freqranges(partials):
+        if not partials:
+            return np.zeros((0,)), np.zeros((0,))
+        freqs = np.concatenate([p[:, 1] for p in partials])
+        offsets = np.cumsum([0] + [len(p) for p in partials[:-1]])
+        return np.minimum.reduceat(freqs, offsets), np.maximum.reduceat(freqs, offsets)
+
+    for k in range(len(bands) - 1):
+        edge = bands[k][1]
+        if bands[k + 1][0] != edge:
+            continue
+        width = max(results[k][2], results[k + 1][2])
+        near = {}
+        for b in (k, k + 1):
+            minfreqs, maxfreqs = freqranges(bandpartials[b])
+            near[b] = np.flatnonzero((minfreqs <= edge + width) & (maxfreqs >= edge - width))
+        spans = {b: np.array([(bandpartials[b][i][0, 0], bandpartials[b][i][-1, 0])
+                              for i in near[b]]).reshape(-1, 2)
+                 for b in (k, k + 1)}
+        drops = {}
+        for b, other in ((k, k + 1), (k + 1, k)):
+            starts, ends = spans[other][:, 0], spans[other][:, 1]
+            durs = ends - starts
+            for i in near[b]:
+                p = bandpartials[b][i]
+                dur = p[-1, 0] - p[0, 0]
+                longer = (durs > dur) if other > b else (durs >= dur)
+                candidates = np.flatnonzero(longer & (starts <= p[-1, 0]) & (ends >= p[0, 0]))
+                if len(candidates) == 0:
+                    continue
+                zone = np.abs(p[:, 1] - edge) <= width
+                drop = np.zeros(len(p), dtype=bool)
+                for j in candidates:
+                    q = bandpartials[other][near[other][j]]
+                    inside = zone & (p[:, 0] >= q[0, 0]) & (p[:, 0] <= q[-1, 0])
+                    if inside.any():
+                        qfreqs = np.interp(p[inside, 0], q[:, 0], q[:, 1])
+                        drop[inside] |= np.abs(qfreqs - p[inside, 1]) <= width
+                if drop.any():
+                    drops[(b, i)] = drop
+        for b in (k, k + 1):
+            partials = []
+            for i, p in enumerate(bandpartials[b]):
+                drop = drops.get((b, i))
+                if drop is None:
+                    partials.append(p)
+                    continue
+                numdropped += int(drop.sum())
+                kept = np.flatnonzero(~drop)
+                runs = np.split(kept, np.flatnonzero(np.diff(kept) > 1) + 1)
+                partials.extend(p[run] for run in runs if len(run) >= 2)
+            bandpartials[b] = partials
+    results = [(partials, hoptime, freqdrift)
+               for partials, (_, hoptime, freqdrift) in zip(bandpartials, results)]
+    return results, numdropped
+
+
+def _join_band_edges(bands, results):
+    """
+    Join the partials which cross the edge between two adjacent bands
+
+    A partial ending near an edge is continued by a partial of the band at the
+    other side of the edge, if this starts near the edge and shortly after.
+    Candidates are paired greedily, best match (nearest in time and frequency)
+    first.
+
+    Args:
+        bands: a list of (minfreq, maxfreq) per band
+        results: a list of (partials, hoptime, freqdrift) per band, as
+            returned by _analyze_band
+
+    Returns:
+        a tuple (partials, numjoins). Partials are sorted by start time
+    """
+    partials = [p for result in results for p in result[0]]
+    if not partials:
+        return [], 0
+    band = np.repeat(np.arange(len(results)), [len(result[0]) for result in results])
+    t0 = np.array([p[0, 0] for p in partials])
+    t1 = np.array([p[-1, 0] for p in partials])
+    f0 = np.array([p[0, 1] for p in partials])
+    f1 = np.array([p[-1, 1] for p in partials])
+    successor = {}   # partial index -> (next partial, first row to keep)
+    joined = set()   # partials which continue another partial
+    for k in range(len(bands) - 1):
+        edge = bands[k][1]
+        if bands[k + 1][0] != edge:
+            continue
+        _, hop0, drift0 = results[k]
+        _, hop1, drift1 = results[k + 1]
+        width = max(drift0, drift1)
+        # the last frame of one band and the first of the other can be up to
+        # one hop of each apart, reassigned times can overlap by a short hop
+        gap = hop0 + hop1
+        overlap = min(hop0, hop1)
+        inedge = (band == k) | (band == k + 1)
+        enders = np.flatnonzero(inedge & (np.abs(f1 - edge) <= width))
+        starters = np.flatnonzero(inedge & (np.abs(f0 - edge) <= width))
+        starters = starters[np.argsort(t0[starters])]
+        startimes = t0[starters]
+        pairs = []
+        for i in enders:
+            lo = np.searchsorted(startimes, t1[i] - overlap, side='right')
+            hi = np.searchsorted(startimes, t1[i] + gap, side='right')
+            for j in starters[lo:hi]:
+                df = abs(f0[j] - f1[i])
+                if band[j] != band[i] and df <= width:
+                    pairs.append((df / width + abs(t0[j] - t1[i]) / gap, i, j))
+        pairs.sort()
+        for _, i, j in pairs:
+            if i in successor or j in joined:
+                continue
+            # drop the breakpoints of j overlapping with the end of i
+            start = np.searchsorted(partials[j][:, 0], t1[i], side='right')
+            if start < len(partials[j]):
+                successor[i] = (j, start)
+                joined.add(j)
+    out = []
+    for i in range(len(partials)):
+        if i in joined:
+            continue
+        rows = [partials[i]]
+        while i in successor:
+            i, start = successor[i]
+            rows.append(partials[i][start:])
+        out.append(np.concatenate(rows) if len(rows) > 1 else rows[0])
+    out.sort(key=lambda p: p[0, 0])
+    return out, len(successor)
+
+
+def analyze_multires(samples, double sr, bands, double sidelobe=-1, double ampfloor=-90,
+                     double residuebw=-1, double convergencebw=-1, gate=None,
+                     int workers=0):
+    """
+    Multi-resolution Partial Tracking Analysis
+
+    The spectrum is divided in frequency bands, each analyzed with its own
+    resolution and window: long windows for low bands, where partials are
+    close to each other, and short windows (and more frames) for high bands,
+    where time resolution matters more. The bands are analyzed concurrently in
+    a thread pool and only the peaks within each band are tracked. A component
+    found by both bands at a shared edge is kept only once, and a partial
+    crossing the edge between two adjacent bands is joined across it.
+
+    Args:
+        samples: numpy.ndarray. An array representing a mono sndfile (see `analyze`)
+        sr: int (Hz). The sampling rate
+        bands: a list of tuples (minfreq, maxfreq, resolution, windowsize), sorted by
+            frequency and not overlapping. maxfreq can be 0 for the highest band, to
+            analyze up to the nyquist frequency. windowsize can be -1 to use the
+            default for the given resolution (see `analyze`). Bands below
+            the nyquist frequency are decimated as with maxfreq in `analyze`. Partials
+            are only joined between bands which share an edge
+        sidelobe, ampfloor, residuebw, convergencebw, gate: analysis parameters,
+            used for all bands, see `analyze`. hoptime, freqdrift and croptime
+            take the default for the resolution and window of each band
+        workers: the number of bands analyzed at the same time. If 0, one per band,
+            up to the number of cpus
+
+    Returns:
+        a list of partials (see `analyze`), sorted by start time
+
+    ### Example
+
+    ```python
+    samples, sr = lt.util.sndreadmono("piano.wav")
+    partials = lt.analyze_multires(samples, sr, bands=[(0, 500, 20, 40),
+                                                       (500, 2000, 50, 100),
+                                                       (2000, 0, 120, 240)])
+    ```
+    """
+    samples = np.asarray(samples)
+    if samples.ndim != 1:
+        raise ValueError(f"Expected a 1D array of samples, got shape {samples.shape}")
+    bands = [tuple(band) for band in bands]
+    if not bands:
+        raise ValueError("At least one band is needed")
+    for i, band in enumerate(bands):
+        if len(band) != 4:
+            raise ValueError(f"A band should be a tuple (minfreq, maxfreq, resolution, "
+                             f"windowsize), got {band}")
+        minfreq, maxfreq, resolution, windowsize = band
+        if maxfreq <= 0 or maxfreq >= sr / 2:
+            if i < len(bands) - 1:
+                raise ValueError(f"Only the highest band can extend to the nyquist "
+                                 f"frequency, got {band}")
+            maxfreq = 0
+        elif minfreq >= maxfreq:
+            raise ValueError(f"Expected minfreq < maxfreq, got {band}")
+        if resolution <= 0:
+            raise ValueError(f"The resolution should be positive, got {band}")
+        if i > 0 and minfreq < bands[i - 1][1]:
+            raise ValueError(f"Bands should be sorted and should not overlap, "
+                             f"got {bands[i - 1]} and {band}")
+        bands[i] = (minfreq, maxfreq, resolution, windowsize if windowsize else -1)
+    if workers <= 0:
+        workers = min(len(bands), os.cpu_count() or 1)
+
+    def analyzeband(band):
+        minfreq, maxfreq, resolution, windowsize = band
+        return _analyze_band(samples, sr, minfreq, maxfreq, resolution, windowsize,
+                             sidelobe, ampfloor, residuebw, convergencebw, gate)
+
+    if workers <= 1 or len(bands) < 2:
+        results = [analyzeband(band) for band in bands]
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(analyzeband, bands))
+    edges = [(band[0], band[1]) for band in bands]
+    results, numdropped = _drop_edge_duplicates(edges, results)
+    partials, numjoins = _join_band_edges(edges, results)
+    logger.info(f"analyze_multires: {numdropped} duplicate breakpoints removed and "
+                f"{numjoins} partials joined at band edges")
+    return partials
+
+
+def analyze_peaks(samples, double sr, double resolution, double windowsize=-1,
+                  double hoptime=-1, double sidelobe=-1, double ampfloor=-90,
+                  double croptime=-1, double residuebw=-1, double convergencebw=-1,
+                  gate=None, double maxfreq=0):
+    """
+    Spectral peak analysis, without partial tracking
+
+    Runs the same analysis as `analyze` up to the selection of the spectral
+    peaks of each frame (thinning and bandwidth association included), but
+    does not link the peaks into partials.
+
+    Args:
+        samples: numpy.ndarray. An array representing a mono sndfile (see `analyze`)
+        sr: int (Hz). The sampling rate
+        resolution, windowsize, hoptime, sidelobe, ampfloor, croptime, residuebw,
+            convergencebw, gate, maxfreq: analysis parameters, see `analyze`
+
+    Returns:
+        a tuple (peaks, offsets). peaks is an array of shape (numpeaks, 6), with
+        rows [frame, time, freq, amp, phase, bw], sorted by frame and, within a
+        frame, by frequency. time is the reassigned time of the peak. offsets
+        (int64) has numframes + 1 items: the peaks of frame i are
+        ``peaks[offsets[i]:offsets[i+1]]``
+
+    ### Example
+
+    ```python
+    samples, sr = lt.util.sndreadmono("voice.wav")
+    peaks, offsets = lt.analyze_peaks(samples, sr, resolution=50)
+    # number of peaks per frame
+    counts = np.diff(offsets)
+    ```
+    """
+    samples, sr = _analysis_samples(samples, sr, maxfreq, ampfloor)
+    cdef loris.Analyzer* an = _new_analyzer(sr, resolution, windowsize, hoptime, -1,
+                                            sidelobe, ampfloor, croptime, residuebw,
+                                            convergencebw, gate, maxfreq)
+    cdef _SampleBuffer buf = _samplebuffer(samples)
+    # The last sample is not analyzed, as in analyze
+    cdef long numsamples = max(len(samples) - 1, 0)
+    with nogil:
+        an.analyzePeaks(_read_samples, &buf, numsamples, sr)
+    if gate is not None:
+        _log_gated(an, numsamples, sr)
+    cdef const double *data = an.peakData().data()
+    cdef const long *frames = an.peakFrames().data()
+    cdef Py_ssize_t numframes = an.peakFrames().size() - 1
+    cdef Py_ssize_t numpeaks = frames[numframes]
+    peaks = np.empty((numpeaks, 6), dtype=float)
+    offsets = np.empty(numframes + 1, dtype=np.int64)
+    cdef double[:, ::1] peaksview = peaks
+    cdef int64_t[::1] offsetsview = offsets
+    cdef Py_ssize_t frame, i, k
+    with nogil:
+        for frame in range(numframes + 1):
+            offsetsview[frame] = frames[frame]
+        for frame in range(numframes):
+            for i in range(frames[frame], frames[frame + 1]):
+                peaksview[i, 0] = frame
+                for k in range(5):
+                    peaksview[i, k + 1] = data[i * 5 + k]
+    del an
+    return peaks, offsets
+
+
+def track(peaks, offsets, double freqdrift):
+    """
+    Form partials from the spectral peaks of an analysis
+
+    This is the partial tracking stage of `analyze`, applied to the output of
+    `analyze_peaks`. ``track(*analyze_peaks(samples, sr, resolution, ...), freqdrift)``
+    returns the same partials as ``analyze(samples, sr, resolution, ..., freqdrift=freqdrift)``,
+    so that different tracking parameters can be tried without running the spectral
+    analysis again
+
+    Args:
+        peaks: the peaks, as returned by `analyze_peaks`: an array of shape
+            (numpeaks, 6) with rows [frame, time, freq, amp, phase, bw]
+        offsets: the frame offsets, as returned by `analyze_peaks`
+        freqdrift: Hz. The maximum variation of frecuency between two breakpoints to be
+            considered to belong to the same partial. `analyze` uses
+            resolution / 2 by default
+
+    Returns:
+        a list of partials (see `analyze`)
+
+    ### Example
+
+    ```python
+    peaks, offsets = lt.analyze_peaks(samples, sr, resolution=50)
+    for freqdrift in (10, 20, 30, 40):
+        partials = lt.track(peaks, offsets, freqdrift=freqdrift)
+        print(freqdrift, len(partials))
+    ```
+    """
+    peaks = np.ascontiguousarray(peaks, dtype=float)
+    offsets = np.asarray(offsets)
+    if peaks.ndim != 2 or peaks.shape[1] < 6:
+        raise ValueError(f"Expected peaks of shape (numpeaks, 6), got {peaks.shape}")
+    if offsets.ndim != 1 or len(offsets) == 0:
+        raise ValueError("offsets should be a 1D array with numframes + 1 items")
+    if offsets[0] != 0 or offsets[-1] != len(peaks) or np.any(np.diff(offsets) < 0):
+        raise ValueError("offsets should increase from 0 to the number of peaks")
+    if freqdrift <= 0:
+        raise ValueError(f"freqdrift should be positive, got {freqdrift}")
+    cdef vector[long] frames = offsets
+    cdef long numframes = len(offsets) - 1
+    cdef long rowsize = peaks.shape[1]
+    cdef const double[:, ::1] rows = peaks
+    cdef const double *rowsptr = &rows[0, 1] if len(peaks) else NULL
+    # only the tracking parameters are used, resolution and window are placeholders
+    cdef loris.Analyzer* an = new loris.Analyzer(freqdrift * 2, freqdrift * 4)
+    an.setFreqDrift(freqdrift)
+    with nogil:
+        an.trackPeaks(rowsptr, rowsize, frames.data(), numframes)
+    out = PartialList_toarray(&an.partials())
+    del an
+    return out
+
+
 cdef double kaiserWindowShape(double atten):
     if atten > 60.0:
         alpha = 0.12438 * (atten + 6.3)
@@ -230,18 +869,9 @@ cdef loris.Partial* newPartial_fromarray(_np.ndarray[SAMPLE_t, ndim=2] a):
     return p
 
 
-def read_sdif(path):
+def _read_sdif_loris(path):
     """
-    Read the SDIF file
-
-    Args:
-        sdiffile: (str) The path to a SDIF file
-
-    Returns:
-        a tuple(list of partials, labels), where a partial is a 2D numpy
-        array with shape (num. breakpoints, 5) with the columns (time,
-        frequency, amplitude, phase and bandwidth). `labels` is list of
-        the labels for each partial
+    Read the SDIF file via loris::SdifFile (see read_sdif)
     """
     cdef loris.SdifFile* sdif
     cdef loris.PartialList partials
@@ -267,6 +897,551 @@ def read_sdif(path):
     return (matrices, labels)
 
 
+# ------------------------------------------------------------------
+# SDIF reader
+#
+# SDIF data is big endian. A frame is a header
+#     type (4 bytes), size (int32), time (float64), stream id (int32),
+#     number of matrices (int32)
+# followed by its matrices, each one a header
+#     type (4 bytes), data type (int32), rows (int32), columns (int32)
+# followed by the data, padded to a multiple of 8 bytes. `size` counts
+# the bytes after the size field.
+#
+# Loris stores partials as rows [index freq amp phase bw timeoffset]
+# of RBEP matrices (or [index freq amp phase] for 1TRC). The time of
+# a breakpoint is the frame time plus its time offset. Labels are stored
+# as rows [index label] of RBEL matrices
+# ------------------------------------------------------------------
+
+cdef inline uint32_t _be32(const unsigned char *p) noexcept nogil:
+    return ((<uint32_t>p[0]) << 24) | ((<uint32_t>p[1]) << 16) | ((<uint32_t>p[2]) << 8) | (<uint32_t>p[3])
+
+
+cdef inline double _bef64(const unsigned char *p) noexcept nogil:
+    cdef uint64_t u = ((<uint64_t>_be32(p)) << 32) | (<uint64_t>_be32(p + 4))
+    cdef double d
+    memcpy(&d, &u, 8)
+    return d
+
+
+cdef inline float _bef32(const unsigned char *p) noexcept nogil:
+    cdef uint32_t u = _be32(p)
+    cdef float f
+    memcpy(&f, &u, 4)
+    return f
+
+
+cdef inline bint _issig(const unsigned char *p, const char *sig) noexcept nogil:
+    return p[0] == sig[0] and p[1] == sig[1] and p[2] == sig[2] and p[3] == sig[3]
+
+
+cdef inline bint _isloris(const unsigned char *p) noexcept nogil:
+    return _issig(p, b"RBEP") or _issig(p, b"1TRC") or _issig(p, b"RBEL")
+
+
+cdef enum:
+    SDIF_INDEX = 0
+    SDIF_COUNT = 1
+    SDIF_FILL = 2
+    SDIF_STREAM = 3
+    SDIF_MAXCOLS = 7
+    SDIF_FRAMEHEADER = 24
+    SDIF_MATRIXHEADER = 16
+
+
+cdef class _SdifReader:
+    """
+    Reads the partials of a Loris SDIF file from a memory mapped buffer
+
+    All frames are scanned once to build an index of the frames holding
+    partial data (their offset and the time range of their breakpoints).
+    Partials are then read in two passes over the selected frames: the
+    first one counts the breakpoints of each partial, the second one
+    writes them directly into a preallocated table (`read`) or into one
+    array per partial, allocated at its first breakpoint (`stream`)
+    """
+    cdef object _file
+    cdef object _mmap
+    cdef const unsigned char[::1] _buf
+    cdef readonly object path
+    cdef readonly object frameoffsets
+    cdef readonly object framemintimes
+    cdef readonly object framemaxtimes
+    # per partial index
+    cdef vector[Py_ssize_t] _counts
+    cdef vector[double] _maxamps
+    cdef vector[int] _labels
+    cdef vector[Py_ssize_t] _dest
+    # per partial index (built by SDIF_STREAM): the open partials
+    cdef vector[double*] _open
+    cdef vector[Py_ssize_t] _completed
+    cdef vector[char] _unsorted
+    cdef dict _arrays
+    # per frame (built by SDIF_INDEX)
+    cdef double _mintime, _maxtime
+    cdef double _t0, _t1
+    cdef double *_table
+
+    def __cinit__(self, path):
+        import mmap
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < 16:
+            self._file.close()
+            raise ValueError(f"{path} is not a SDIF file")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = self._mmap
+        if not _issig(&self._buf[0], b"SDIF"):
+            self.close()
+            raise ValueError(f"{path} is not a SDIF file")
+        self._t0 = -INFINITY
+        self._t1 = INFINITY
+
+    def close(self):
+        self._buf = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __dealloc__(self):
+        self._buf = None
+
+    cdef Py_ssize_t _firstframe(self) except -1:
+        """ Offset of the first frame after the SDIF header """
+        cdef uint32_t headersize = _be32(&self._buf[4])
+        return 8 + headersize
+
+    cdef Py_ssize_t _process_frame(self, Py_ssize_t pos, int mode) except -1:
+        """
+        Process the partial data of the frame at pos. Returns the offset
+        where the frame ends.
+
+        The end of the frame is determined by its matrices and not by the
+        size in the frame header, since loris writes a wrong frame size
+        for float64 data
+        """
+        cdef const unsigned char *buf = &self._buf[0]
+        cdef Py_ssize_t buflen = self._buf.shape[0]
+        cdef Py_ssize_t end, mp, datasize, idx, k
+        cdef double frametime, t, amp
+        cdef int32_t nummatrices, m, r, c, numrows, numcols
+        cdef uint32_t datatype
+        cdef const unsigned char *matrix
+        cdef const unsigned char *rowp
+        cdef double row[SDIF_MAXCOLS]
+        cdef double *dest
+        cdef bint islabel
+        frametime = _bef64(buf + pos + 8)
+        nummatrices = <int32_t>_be32(buf + pos + 20)
+        mp = pos + SDIF_FRAMEHEADER
+        for m in range(nummatrices):
+            if mp + SDIF_MATRIXHEADER > buflen:
+                raise ValueError(f"Truncated SDIF frame at offset {pos}")
+            matrix = buf + mp
+            datatype = _be32(matrix + 4)
+            numrows = <int32_t>_be32(matrix + 8)
+            numcols = <int32_t>_be32(matrix + 12)
+            if numrows < 0 or numcols < 0 or <Py_ssize_t>numrows * numcols > buflen:
+                raise ValueError(f"Invalid SDIF matrix size ({numrows}x{numcols}) at offset {mp}")
+            datasize = <Py_ssize_t>(datatype & 0xff) * numrows * numcols
+            datasize += (8 - datasize % 8) % 8
+            if mp + SDIF_MATRIXHEADER + datasize > buflen:
+                raise ValueError(f"Truncated SDIF matrix at offset {mp}")
+            if (datatype == 4 or datatype == 8) and numcols <= SDIF_MAXCOLS and _isloris(matrix):
+                islabel = _issig(matrix, b"RBEL")
+                rowp = matrix + SDIF_MATRIXHEADER
+                for r in range(numrows):
+                    for c in range(SDIF_MAXCOLS):
+                        row[c] = 0
+                    for c in range(numcols):
+                        if datatype == 8:
+                            row[c] = _bef64(rowp)
+                            rowp += 8
+                        else:
+                            row[c] = _bef32(rowp)
+                            rowp += 4
+                    # skip resampled rows (7-column 1TRC) and invalid indices
+                    if row[6] != 0 or row[0] < 0:
+                        continue
+                    idx = <Py_ssize_t>row[0]
+                    if islabel:
+                        if mode == SDIF_COUNT:
+                            if <Py_ssize_t>self._labels.size() <= idx:
+                                self._labels.resize(idx + 1, 0)
+                            self._labels[idx] = <int>row[1]
+                        continue
+                    t = frametime + row[5]
+                    if mode == SDIF_INDEX:
+                        if t < self._mintime:
+                            self._mintime = t
+                        if t > self._maxtime:
+                            self._maxtime = t
+                        continue
+                    if t < self._t0 or t > self._t1:
+                        continue
+                    if mode == SDIF_COUNT:
+                        if <Py_ssize_t>self._counts.size() <= idx:
+                            self._counts.resize(idx + 1, 0)
+                            self._maxamps.resize(idx + 1, 0)
+                        self._counts[idx] += 1
+                        if row[2] > self._maxamps[idx]:
+                            self._maxamps[idx] = row[2]
+                    elif mode == SDIF_STREAM:
+                        if idx >= <Py_ssize_t>self._dest.size() or self._counts[idx] == 0:
+                            continue
+                        if self._open[idx] == NULL:
+                            arr = np.empty((self._counts[idx], 5), dtype='float64')
+                            self._arrays[idx] = arr
+                            self._open[idx] = <double *>(<_np.ndarray>arr).data
+                        dest = self._open[idx] + 5*self._dest[idx]
+                        if self._dest[idx] > 0 and t - dest[-5] <= 1e-9:
+                            self._unsorted[idx] = 1
+                        dest[0] = t
+                        dest[1] = row[1]
+                        dest[2] = row[2]
+                        dest[3] = row[3]
+                        dest[4] = row[4]
+                        self._dest[idx] += 1
+                        if self._dest[idx] == self._counts[idx]:
+                            self._open[idx] = NULL
+                            self._completed.push_back(idx)
+                    else:
+                        k = self._dest[idx] if idx < <Py_ssize_t>self._dest.size() else -1
+                        if k < 0:
+                            continue
+                        dest = self._table + 5*k
+                        dest[0] = t
+                        dest[1] = row[1]
+                        dest[2] = row[2]
+                        dest[3] = row[3]
+                        dest[4] = row[4]
+                        self._dest[idx] = k + 1
+            mp += SDIF_MATRIXHEADER + datasize
+        return mp
+
+    def build_index(self):
+        """
+        Scan all frames, collecting the offset and the time range of
+        each frame holding partial data (see frameoffsets, framemintimes,
+        framemaxtimes)
+        """
+        cdef const unsigned char *buf = &self._buf[0]
+        cdef Py_ssize_t buflen = self._buf.shape[0]
+        cdef Py_ssize_t pos = self._firstframe()
+        cdef vector[int64_t] offsets
+        cdef vector[double] mintimes, maxtimes
+        cdef int32_t framesize
+        while pos + SDIF_FRAMEHEADER <= buflen:
+            if _isloris(buf + pos):
+                self._mintime = INFINITY
+                self._maxtime = -INFINITY
+                offsets.push_back(pos)
+                pos = self._process_frame(pos, SDIF_INDEX)
+                mintimes.push_back(self._mintime)
+                maxtimes.push_back(self._maxtime)
+            else:
+                # the size counts the rest of the frame header (time, stream id,
+                # number of matrices) and the matrices
+                framesize = <int32_t>_be32(buf + pos + 4)
+                if framesize < SDIF_FRAMEHEADER - 8 or pos + 8 + framesize > buflen:
+                    raise ValueError(f"Invalid SDIF frame size ({framesize}) at offset {pos}")
+                pos += 8 + framesize
+        self.frameoffsets = np.array(offsets, dtype=np.int64)
+        self.framemintimes = np.array(mintimes, dtype=float)
+        self.framemaxtimes = np.array(maxtimes, dtype=float)
+
+    def set_index(self, offsets, mintimes, maxtimes):
+        self.frameoffsets = np.asarray(offsets, dtype=np.int64)
+        self.framemintimes = np.asarray(mintimes, dtype=float)
+        self.framemaxtimes = np.asarray(maxtimes, dtype=float)
+
+    def _frames(self, double t0, double t1):
+        """ The offsets of the frames with breakpoints or labels within [t0, t1] """
+        if t0 == -INFINITY and t1 == INFINITY:
+            return self.frameoffsets
+        # frames without breakpoints (only labels) have mintime = inf
+        mask = ((self.framemaxtimes >= t0) & (self.framemintimes <= t1)) | np.isinf(self.framemintimes)
+        return self.frameoffsets[mask]
+
+    def count(self, double t0=-INFINITY, double t1=INFINITY):
+        """
+        Count the breakpoints of each partial within [t0, t1]
+
+        Returns:
+            a tuple (counts, maxamps, labels), indexed by partial index
+        """
+        cdef const int64_t[::1] frames = self._frames(t0, t1)
+        cdef Py_ssize_t i
+        self._t0, self._t1 = t0, t1
+        self._counts.clear()
+        self._maxamps.clear()
+        self._labels.clear()
+        for i in range(frames.shape[0]):
+            self._process_frame(frames[i], SDIF_COUNT)
+        cdef Py_ssize_t n = max(self._counts.size(), self._labels.size())
+        counts = np.zeros((n,), dtype=np.intp)
+        maxamps = np.zeros((n,), dtype=float)
+        labels = np.zeros((n,), dtype=np.intc)
+        cdef Py_ssize_t[::1] countsview = counts
+        cdef double[::1] maxampsview = maxamps
+        cdef int[::1] labelsview = labels
+        for i in range(<Py_ssize_t>self._counts.size()):
+            countsview[i] = self._counts[i]
+            maxampsview[i] = self._maxamps[i]
+        for i in range(<Py_ssize_t>self._labels.size()):
+            labelsview[i] = self._labels[i]
+        return counts, maxamps, labels
+
+    def _select(self, double t0, double t1, labels, double minamp):
+        """
+        Count the breakpoints and select the partials to read
+
+        Returns:
+            a tuple (counts, labels, idxs), where idxs are the indices of the
+            selected partials
+        """
+        counts, maxamps, partiallabels = self.count(t0, t1)
+        keep = (counts > 0) & (maxamps >= minamp)
+        if labels is not None:
+            keep &= np.isin(partiallabels, np.asarray(list(labels), dtype=np.intc))
+        return counts, partiallabels, np.flatnonzero(keep)
+
+    def read(self, double t0=-INFINITY, double t1=INFINITY, labels=None, double minamp=0):
+        """
+        Read the partials
+
+        Args:
+            t0, t1: only breakpoints within this time range are read
+            labels: if given, a seq. of labels. Only partials with one of these
+                labels are read
+            minamp: only partials with a max. amplitude (within [t0, t1])
+                higher or equal to this are read
+
+        Returns:
+            a tuple (partials, labels)
+        """
+        counts, partiallabels, idxs = self._select(t0, t1, labels, minamp)
+        sizes = counts[idxs]
+        starts = np.full((len(counts),), -1, dtype=np.intp)
+        starts[idxs] = np.cumsum(sizes) - sizes
+        cdef _np.ndarray table = np.empty((int(sizes.sum()), 5), dtype='float64')
+        cdef const int64_t[::1] frames = self._frames(t0, t1)
+        cdef const Py_ssize_t[::1] startsview = starts
+        cdef Py_ssize_t i
+        self._t0, self._t1 = t0, t1
+        self._dest.resize(startsview.shape[0])
+        for i in range(startsview.shape[0]):
+            self._dest[i] = startsview[i]
+        self._table = <double *>table.data
+        try:
+            for i in range(frames.shape[0]):
+                self._process_frame(frames[i], SDIF_FILL)
+        finally:
+            self._table = NULL
+            self._dest.clear()
+        offsets = np.empty((len(idxs) + 1,), dtype=np.intp)
+        offsets[0] = 0
+        np.cumsum(sizes, out=offsets[1:])
+        cdef list bounds = offsets.tolist()
+        partials = [table[bounds[i]:bounds[i+1]] for i in range(len(idxs))]
+        # Breakpoints are normally written sorted in time. Otherwise sort them
+        # and, like loris, replace breakpoints less than 1ns apart
+        if len(table) > 1:
+            unsorted = np.diff(table[:, 0]) <= 1e-9
+            # the diff between the last bp of a partial and the first of the next
+            unsorted[offsets[1:-1] - 1] = False
+            if unsorted.any():
+                for i in np.unique(np.searchsorted(offsets, np.flatnonzero(unsorted), side='right') - 1).tolist():
+                    partials[i] = _sort_breakpoints(partials[i])
+        return partials, partiallabels[idxs].tolist()
+
+    def stream(self, double t0=-INFINITY, double t1=INFINITY, labels=None, double minamp=0):
+        """
+        Generator yielding the partials as soon as their last breakpoint is read
+
+        Args:
+            t0, t1: only breakpoints within this time range are read
+            labels: if given, a seq. of labels. Only partials with one of these
+                labels are read
+            minamp: only partials with a max. amplitude (within [t0, t1])
+                higher or equal to this are read
+
+        Returns:
+            a generator of tuples (partial, label)
+        """
+        counts, partiallabels, idxs = self._select(t0, t1, labels, minamp)
+        cdef Py_ssize_t i, j, idx
+        cdef Py_ssize_t n = len(counts)
+        cdef const Py_ssize_t[::1] countsview = counts
+        cdef const Py_ssize_t[::1] idxsview = idxs
+        cdef const int64_t[::1] frames = self._frames(t0, t1)
+        # Only the selected partials have a count, the count pass is done
+        self._counts.assign(n, 0)
+        for i in range(idxsview.shape[0]):
+            self._counts[idxsview[i]] = countsview[idxsview[i]]
+        self._dest.assign(n, 0)
+        self._open.assign(n, NULL)
+        self._unsorted.assign(n, 0)
+        self._arrays = {}
+        self._t0, self._t1 = t0, t1
+        try:
+            for i in range(frames.shape[0]):
+                self._process_frame(frames[i], SDIF_STREAM)
+                for j in range(<Py_ssize_t>self._completed.size()):
+                    idx = self._completed[j]
+                    p = self._arrays.pop(idx)
+                    if self._unsorted[idx]:
+                        p = _sort_breakpoints(p)
+                    yield p, int(partiallabels[idx])
+                self._completed.clear()
+        finally:
+            self._open.clear()
+            self._unsorted.clear()
+            self._dest.clear()
+            self._completed.clear()
+            self._arrays = None
+
+
+def _sort_breakpoints(p):
+    """
+    Sort the breakpoints of p by time. A breakpoint less than 1ns apart from
+    a previously read breakpoint replaces it
+    """
+    cdef dict bps = {}
+    cdef list times = []
+    for row in p:
+        t = row[0]
+        i = np.searchsorted(times, t)
+        if i < len(times) and times[i] - t < 1e-9:
+            times.pop(i)
+        elif i > 0 and t - times[i-1] < 1e-9:
+            times.pop(i-1)
+            i -= 1
+        times.insert(i, t)
+        bps[t] = row
+    return np.array([bps[t] for t in times], dtype=float)
+
+
+# path -> (size, mtime, frameoffsets, framemintimes, framemaxtimes)
+_sdif_indexes = {}
+_SDIF_MAXINDEXES = 16
+
+
+def _sdif_index(_SdifReader reader):
+    """
+    Set the frame index of reader, reusing the index of a previous read of the
+    same file if it has not been modified since
+    """
+    st = os.stat(reader.path)
+    cached = _sdif_indexes.get(reader.path)
+    if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        reader.set_index(*cached[2:])
+        return
+    reader.build_index()
+    if len(_sdif_indexes) >= _SDIF_MAXINDEXES:
+        del _sdif_indexes[next(iter(_sdif_indexes))]
+    _sdif_indexes[reader.path] = (st.st_size, st.st_mtime_ns, reader.frameoffsets,
+                                  reader.framemintimes, reader.framemaxtimes)
+
+
+def read_sdif(path, double t0=0., double t1=0., labels=None, double minamp=-120):
+    """
+    Read the SDIF file
+
+    Args:
+        sdiffile: (str) The path to a SDIF file
+        t0: only breakpoints after this time are read
+        t1: only breakpoints before this time are read. 0 reads until the
+            end of the file
+        labels: if given, a seq. of labels. Only partials with one of these
+            labels are read
+        minamp: the min. amplitude (in dB) of a partial within [t0, t1].
+            Partials which never reach this amplitude are skipped
+
+    Returns:
+        a tuple(list of partials, labels), where a partial is a 2D numpy
+        array with shape (num. breakpoints, 5) with the columns (time,
+        frequency, amplitude, phase and bandwidth). `labels` is list of
+        the labels for each partial
+
+    !!! note
+
+        The file is memory-mapped and the breakpoints are written directly into
+        one table. The partials returned are views into this table.
+
+        The first read of a file builds an index of its frames, which is
+        kept in memory. A time range only reads the frames
+        within it, and a partial is cropped to its breakpoints within [t0, t1].
+        Partials excluded by `labels` or `minamp` are never allocated
+    """
+    path = os.path.abspath(os.path.expanduser(path))
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"read_sdif: {path} not found")
+    if t1 == 0:
+        t1 = INFINITY
+    if t1 < t0:
+        raise ValueError(f"read_sdif: t1 ({t1}) should be higher than t0 ({t0})")
+    reader = _SdifReader(path)
+    try:
+        _sdif_index(reader)
+        return reader.read(t0 if t0 > 0 else -INFINITY, t1, labels=labels,
+                           minamp=10**(minamp/20) if minamp > -120 else 0)
+    finally:
+        reader.close()
+
+
+def iter_sdif(path, double t0=0., double t1=0., labels=None, double minamp=-120):
+    """
+    Iterate over the partials of a SDIF file
+
+    Like `read_sdif`, but the partials are yielded one at a time, as soon as
+    their last breakpoint has been read. Only the partials which are
+    still open at the current frame are kept in memory
+
+    Args:
+        sdiffile: (str) The path to a SDIF file
+        t0: only breakpoints after this time are read
+        t1: only breakpoints before this time are read. 0 reads until the
+            end of the file
+        labels: if given, a seq. of labels. Only partials with one of these
+            labels are read
+        minamp: the min. amplitude (in dB) of a partial within [t0, t1].
+            Partials which never reach this amplitude are skipped
+
+    Returns:
+        a generator of tuples (partial, label), where a partial is a 2D numpy
+        array with shape (num. breakpoints, 5) with the columns (time,
+        frequency, amplitude, phase and bandwidth). Partials are yielded
+        in the order in which they end
+
+    !!! note
+
+        The file is scanned once before the first partial is yielded to count
+        the breakpoints of each partial, so each partial is allocated with
+        its final size. This needs memory proportional to the number of
+        partials, not to the number of breakpoints
+    """
+    path = os.path.abspath(os.path.expanduser(path))
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"iter_sdif: {path} not found")
+    if t1 == 0:
+        t1 = INFINITY
+    if t1 < t0:
+        raise ValueError(f"iter_sdif: t1 ({t1}) should be higher than t0 ({t0})")
+    reader = _SdifReader(path)
+    try:
+        _sdif_index(reader)
+        yield from reader.stream(t0 if t0 > 0 else -INFINITY, t1, labels=labels,
+                                 minamp=10**(minamp/20) if minamp > -120 else 0)
+    finally:
+        reader.close()
+
+
 def _isiterable(seq):
     return hasattr(seq, '__iter__') and not isinstance(seq, (str, bytes))
 
@@ -433,39 +1608,127 @@ cdef loris.PartialList* PartialList_fromdata(dataseq):
     return partials
 
 
-def read_aiff(path):
+cdef double _be_extended(const unsigned char *p) noexcept nogil:
+    """ Convert an 80 bit IEEE 754 extended float (the AIFF sample rate) """
+    cdef int exponent = ((p[0] & 0x7f) << 8) | p[1]
+    cdef uint64_t mantissa = ((<uint64_t>_be32(p + 2)) << 32) | (<uint64_t>_be32(p + 6))
+    cdef double x
+    if exponent == 0 and mantissa == 0:
+        return 0.
+    x = ldexp(<double>mantissa, exponent - 16383 - 63)
+    return -x if p[0] & 0x80 else x
+
+
+cdef void _decode_aiff(const unsigned char *data, Py_ssize_t numframes, Py_ssize_t framebytes,
+                       int samplebytes, const Py_ssize_t *chans, Py_ssize_t numchans,
+                       double *out) noexcept nogil:
+    """ Decode big endian PCM samples of the given channels into out (interleaved) """
+    cdef double scale = pow(0.5, samplebytes * 8 - 1)
+    cdef const unsigned char *p
+    cdef int64_t samp
+    cdef Py_ssize_t i, c
+    cdef int j
+    for i in range(numframes):
+        for c in range(numchans):
+            p = data + i * framebytes + chans[c] * samplebytes
+            # the leading byte carries the sign
+            samp = <signed char>p[0]
+            for j in range(1, samplebytes):
+                samp = samp * 256 + p[j]
+            out[i * numchans + c] = scale * samp
+
+
+def read_aiff(path, Py_ssize_t start=0, Py_ssize_t end=0, channels=None):
     """
-    Read a mono AIFF file (Loris does not read stereo files)
+    Read an AIFF file
+
+    Samples are decoded directly from the memory mapped file into the returned
+    array, 8, 16, 24 and 32 bit PCM are supported.
 
     !!! note
 
-        Raises ValueError if the soundfile is not mono
+        Raises ValueError if the file is not an uncompressed AIFF file
 
     Args:
         path: (str) The path to the soundfile (.aif or .aiff)
+        start: the first frame to read
+        end: the frame to stop reading at (not included). 0 reads until the end
+            of the file
+        channels: None to read all channels, an int to read only the given channel
+            or a list of channel indexes
 
     Returns:
-        A tuple (audiodata, samplerate), where audiodata is a 1D numpy
-        array of type double, holding the samples
-    """
-    cdef loris.AiffFile* aiff = new loris.AiffFile(string(<char*>path))
-    cdef vector[double] samples = aiff.samples()
-    cdef double[:] mono
-    cdef vector[double].iterator it
-    cdef int channels = aiff.numChannels()
-    cdef double samplerate = aiff.sampleRate()
-    if channels != 1:
-        raise ValueError("Can only read mono files")
-    cdef int numFrames = aiff.numFrames()
-    mono = np.empty((numFrames,), dtype='float64')
-    it = samples.begin()
-    cdef int i = 0
-    while i < numFrames:
-        mono[i] = deref(it)
-        i += 1
-        inc(it)
-    del aiff
-    return np.asarray(mono), samplerate
+        A tuple (audiodata, samplerate), where audiodata is a numpy array of type
+        double, holding the samples. It is a 1D array if channels is an int or
+        if the file is mono and channels is None, and an array of shape
+        (numframes, numchannels) otherwise
+    """
+    import mmap
+    path = os.fspath(path)
+    if isinstance(path, bytes):
+        path = path.decode()
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"read_aiff: {path} not found")
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < 12:
+            raise ValueError(f"{path} is not an AIFF file")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    cdef const unsigned char[::1] buf = mm
+    cdef const unsigned char *p = &buf[0]
+    cdef Py_ssize_t size = buf.shape[0]
+    cdef Py_ssize_t pos = 12, chunksize, dataoffset = -1, databytes = 0
+    cdef Py_ssize_t numchannels = 0, numframes = 0, framebytes, i
+    cdef int bits = 0
+    cdef double samplerate = 0.
+    cdef vector[Py_ssize_t] chans
+    cdef double[::1] out
+    try:
+        if not (_issig(p, b"FORM") and _issig(p + 8, b"AIFF")):
+            raise ValueError(f"{path} is not an AIFF file")
+        while pos + 8 <= size:
+            chunksize = _be32(p + pos + 4)
+            if _issig(p + pos, b"COMM") and pos + 26 <= size:
+                numchannels = (p[pos+8] << 8) | p[pos+9]
+                numframes = _be32(p + pos + 10)
+                bits = (p[pos+14] << 8) | p[pos+15]
+                samplerate = _be_extended(p + pos + 16)
+            elif _issig(p + pos, b"SSND") and pos + 16 <= size:
+                dataoffset = pos + 16 + _be32(p + pos + 8)
+                databytes = min(chunksize - 8 - <Py_ssize_t>_be32(p + pos + 8), size - dataoffset)
+            pos += 8 + chunksize + (chunksize & 1)
+        if numchannels == 0 or dataoffset < 0:
+            raise ValueError(f"{path}: no Common or Sound Data chunk found")
+        if bits not in (8, 16, 24, 32):
+            raise ValueError(f"{path}: unsupported sample size ({bits} bits)")
+        framebytes = numchannels * bits // 8
+        numframes = max(0, min(numframes, databytes // framebytes))
+        mono = isinstance(channels, numbers.Integral) or (channels is None and numchannels == 1)
+        if channels is None:
+            channels = range(numchannels)
+        elif isinstance(channels, numbers.Integral):
+            channels = [channels]
+        for chan in channels:
+            if not 0 <= chan < numchannels:
+                raise ValueError(f"Channel {chan} out of range, the file has {numchannels} channels")
+            chans.push_back(chan)
+        if start < 0:
+            raise ValueError(f"start should be a positive frame, got {start}")
+        if end <= 0 or end > numframes:
+            end = numframes
+        start = min(start, end)
+        samples = np.empty((end - start, chans.size()), dtype=float)
+        out = samples.reshape(-1)
+        if out.shape[0] > 0:
+            with nogil:
+                _decode_aiff(p + dataoffset + start * framebytes, end - start, framebytes,
+                             bits // 8, chans.data(), chans.size(), &out[0])
+    finally:
+        out = None
+        buf = None
+        mm.close()
+    if mono:
+        samples = samples.reshape(-1)
+    return samples, samplerate
 
 
 cdef object PartialList_timespan(loris.PartialList * partials):
@@ -482,10 +1745,29 @@ cdef object PartialList_timespan(loris.PartialList * partials):
     return tmin, tmax
 
 
-def synthesize(partials, int samplerate, double fadetime=-1, double start=-1, double end=-1):
+_noisemodes = {
+    'exact': loris.ExactNoise,
+    'shared': loris.SharedNoise
+}
+
+
+def synthesize(partials, int samplerate, double fadetime=-1, double start=-1, double end=-1,
+               str noise='exact'):
     """
     Synthesize the partials as audio
 
+    Partials with a non-zero bandwidth are modulated by filtered gaussian
+    noise. The `noise` parameter determines how this noise is computed:
+
+    * **exact**: one noise sample is generated and filtered for each output sample
+      of each partial (the original Loris implementation)
+    * **shared**: the filtered noise is computed once and shared by all partials,
+      each partial reading it from a different pseudo-random offset to
+      decorrelate simultaneous partials. This is the fastest mode. The noise has
+      the same distribution and spectrum as with *exact* (see `test/test-noise.py`,
+      which compares the rms and the spectral envelope of the rendered noise),
+      but it repeats every 2^17 samples (~3 seconds at 44.1 kHz)
+
     Args:
         partials: a seq. of 2D matrices, each matrix represents a partial
             Each row is a breakpoint of the form [time freq amp phase bw]
@@ -495,10 +1777,14 @@ def synthesize(partials, int samplerate, double fadetime=-1, double start=-1, do
             A minimum fadetime is always applied, even if 0 is given.
         start: the start time of synthesis (-1 = start of data)
         end: the end time of synthesis (-1 = end of data)
+        noise: the quality of the noise used for bandwidth-enhanced partials,
+            'exact' or 'shared' (see above)
 
     Returns:
         the synthesized samples, a numpy 1D array of doubles holding the samples
     """
+    if noise not in _noisemodes:
+        raise ValueError(f"noise should be one of {list(_noisemodes.keys())}, got {noise}")
     cdef int minfadesamps = 16
     cdef float minfade = float(minfadesamps) / samplerate
     if fadetime < 0:
@@ -532,6 +1818,7 @@ def synthesize(partials, int samplerate, double fadetime=-1, double start=-1, do
     bufvector.resize(numsamples)
     cdef int i = 0
     cdef loris.Synthesizer *synthesizer = new loris.Synthesizer(samplerate, bufvector, fadetime)
+    synthesizer.setNoiseMode(_noisemodes[noise])
     cdef loris.Partial *lorispartial
     cdef double synth_t0 = INFINITY
     cdef double synth_t1 = 0
@@ -677,7 +1964,7 @@ cdef _np.ndarray LinearEnvelope_toarray(loris.LinearEnvelope* env, double x0, do
     return np.asarray(out)
 
 
-def meancol(double[:,:] X, int col):
+def meancol(const double[:,:] X, int col):
     """
     Calculate the mean over the given column.
     Similar to X[:,col].mean()
@@ -690,7 +1977,7 @@ def meancol(double[:,:] X, int col):
     return accum / L
 
 
-def meancolw(double[:, :] X, int col, int colw):
+def meancolw(const double[:, :] X, int col, int colw):
     """
     Calculate the mean over `col` column, using col `colw` as weight
     """
@@ -706,6 +1993,446 @@ def meancolw(double[:, :] X, int col, int colw):
     return accum / weightsum
 
 
+def partials_stats(partials):
+    """
+    Calculate statistics for each partial in one pass
+
+    Args:
+        partials: a seq. of 2D arrays with columns [time freq amp phase bw]
+
+    Returns:
+        a 2D array of shape (numpartials, 9), where each row holds the
+        statistics of the corresponding partial, with columns: start, end,
+        duration, numbps, minfreq, maxfreq, meanfreq, meanamp, energy.
+        `meanfreq` and `meanamp` are the unweighted means over all breakpoints,
+        `energy` is meanamp * duration (see `util.partial_energy`)
+    """
+    cdef list matrices = partials if isinstance(partials, list) else list(partials)
+    cdef Py_ssize_t numpartials = len(matrices)
+    cdef double[:, ::1] out = np.empty((numpartials, 9), dtype='float64')
+    cdef const double[:, :] p
+    cdef Py_ssize_t i, j, L
+    cdef double freq, minfreq, maxfreq, freqsum, ampsum, dur, meanamp
+    for i in range(numpartials):
+        p = matrices[i]
+        L = p.shape[0]
+        if L == 0:
+            out[i, :] = np.nan
+            continue
+        minfreq = maxfreq = p[0, 1]
+        freqsum = 0
+        ampsum = 0
+        for j in range(L):
+            freq = p[j, 1]
+            if freq < minfreq:
+                minfreq = freq
+            elif freq > maxfreq:
+                maxfreq = freq
+            freqsum += freq
+            ampsum += p[j, 2]
+        dur = p[L-1, 0] - p[0, 0]
+        meanamp = ampsum / L
+        out[i, 0] = p[0, 0]
+        out[i, 1] = p[L-1, 0]
+        out[i, 2] = dur
+        out[i, 3] = L
+        out[i, 4] = minfreq
+        out[i, 5] = maxfreq
+        out[i, 6] = freqsum / L
+        out[i, 7] = meanamp
+        out[i, 8] = meanamp * dur
+    return np.asarray(out)
+
+
+cdef inline Py_ssize_t _bisect_left(const double[::1] xs, double x) noexcept nogil:
+    cdef Py_ssize_t lo = 0, hi = xs.shape[0], mid
+    while lo < hi:
+        mid = (lo + hi) >> 1
+        if xs[mid] < x:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+cdef inline Py_ssize_t _bisect_right(const double[::1] xs, double x) noexcept nogil:
+    cdef Py_ssize_t lo = 0, hi = xs.shape[0], mid
+    while lo < hi:
+        mid = (lo + hi) >> 1
+        if x < xs[mid]:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+cdef inline Py_ssize_t _find_segment(const double[:, ::1] bps, Py_ssize_t b, Py_ssize_t e,
+                                     double t) noexcept nogil:
+    """
+    The index j of the segment [j, j+1] of the partial bps[b:e] containing t,
+    which is the first j with bps[j+1, 0] >= t (clipped to [b, e-2])
+    """
+    cdef Py_ssize_t lo = b + 1, hi = e - 1, mid
+    while lo < hi:
+        mid = (lo + hi) >> 1
+        if bps[mid, 0] < t:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo - 1
+
+
+cdef enum:
+    EVALBLOCK = 64
+
+
+cdef void _eval_partials(const double[:, ::1] bps, const Py_ssize_t[::1] offsets,
+                         const double[::1] times, const int[::1] cols,
+                         Py_ssize_t first, Py_ssize_t last, bint extend,
+                         floating[:, :, ::1] out) noexcept nogil:
+    """
+    Evaluate partials [first, last) at the given (sorted) times. out has
+    the shape (len(cols), numtimes, numpartials) and is expected to be
+    zeroed if extend is False.
+
+    Partials are processed in blocks of EVALBLOCK columns, sweeping all the
+    rows of a block at once so that the output is written in contiguous
+    runs. Each partial in the block keeps a cursor to its current segment
+    """
+    cdef Py_ssize_t r0[EVALBLOCK]
+    cdef Py_ssize_t r1[EVALBLOCK]
+    cdef Py_ssize_t seg[EVALBLOCK]
+    cdef Py_ssize_t blockstart, blockend, i, j, b, e, r, k, rowstart, rowend
+    cdef Py_ssize_t numtimes = times.shape[0]
+    cdef Py_ssize_t numcols = cols.shape[0]
+    cdef double t, x0, frac
+    blockstart = first
+    while blockstart < last:
+        blockend = min(blockstart + EVALBLOCK, last)
+        rowstart, rowend = numtimes, 0
+        for i in range(blockstart, blockend):
+            b = offsets[i]
+            e = offsets[i+1]
+            if b == e:
+                r0[i - blockstart] = r1[i - blockstart] = 0
+                continue
+            r0[i - blockstart] = _bisect_left(times, bps[b, 0])
+            r1[i - blockstart] = _bisect_right(times, bps[e-1, 0])
+            if r0[i - blockstart] < numtimes:
+                seg[i - blockstart] = _find_segment(bps, b, e, times[r0[i - blockstart]])
+            rowstart = min(rowstart, r0[i - blockstart])
+            rowend = max(rowend, r1[i - blockstart])
+        if extend:
+            rowstart, rowend = 0, numtimes
+        for r in range(rowstart, rowend):
+            t = times[r]
+            for i in range(blockstart, blockend):
+                b = offsets[i]
+                e = offsets[i+1]
+                if r < r0[i - blockstart] or r >= r1[i - blockstart]:
+                    if extend and b < e:
+                        j = b if r < r0[i - blockstart] else e - 1
+                        for k in range(numcols):
+                            out[k, r, i] = <floating>bps[j, cols[k]]
+                    continue
+                if e - b == 1:
+                    for k in range(numcols):
+                        out[k, r, i] = <floating>bps[b, cols[k]]
+                    continue
+                # advance to the segment [j, j+1] containing t
+                j = seg[i - blockstart]
+                while j < e - 2 and bps[j+1, 0] < t:
+                    j += 1
+                seg[i - blockstart] = j
+                x0 = bps[j, 0]
+                frac = (t - x0) / (bps[j+1, 0] - x0) if bps[j+1, 0] > x0 else 0.
+                for k in range(numcols):
+                    out[k, r, i] = <floating>(bps[j, cols[k]] + (bps[j+1, cols[k]] - bps[j, cols[k]]) * frac)
+        blockstart = blockend
+
+
+cdef void _eval_partials_sparse(const double[:, ::1] bps, const Py_ssize_t[::1] offsets,
+                                const double[::1] times, const int[::1] cols,
+                                const Py_ssize_t[::1] firstrow, const Py_ssize_t[::1] dataoffsets,
+                                Py_ssize_t first, Py_ssize_t last,
+                                floating[:, ::1] out) noexcept nogil:
+    cdef Py_ssize_t i, j, b, e, r, k, row, numrows
+    cdef Py_ssize_t numcols = cols.shape[0]
+    cdef double t, x0, frac
+    for i in range(first, last):
+        b = offsets[i]
+        e = offsets[i+1]
+        row = dataoffsets[i]
+        numrows = dataoffsets[i+1] - dataoffsets[i]
+        if numrows == 0:
+            continue
+        j = _find_segment(bps, b, e, times[firstrow[i]])
+        for r in range(firstrow[i], firstrow[i] + numrows):
+            t = times[r]
+            while j < e - 2 and bps[j+1, 0] < t:
+                j += 1
+            if e - b == 1:
+                for k in range(numcols):
+                    out[row, k] = <floating>bps[b, cols[k]]
+            else:
+                x0 = bps[j, 0]
+                frac = (t - x0) / (bps[j+1, 0] - x0) if bps[j+1, 0] > x0 else 0.
+                for k in range(numcols):
+                    out[row, k] = <floating>(bps[j, cols[k]] + (bps[j+1, cols[k]] - bps[j, cols[k]]) * frac)
+            row += 1
+
+
+def _run_chunks(func, Py_ssize_t numpartials, int workers):
+    """ Call func(first, last) over chunks of partials, in parallel if workers > 1 """
+    if workers <= 1 or numpartials < 2:
+        func(0, numpartials)
+        return
+    from concurrent.futures import ThreadPoolExecutor
+    # chunks are aligned to the block size used by _eval_partials
+    chunksize = max(1, (numpartials + workers - 1) // workers)
+    chunksize = ((chunksize + EVALBLOCK - 1) // EVALBLOCK) * EVALBLOCK
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(func, first, min(first + chunksize, numpartials))
+                   for first in range(0, numpartials, chunksize)]
+        for future in futures:
+            future.result()
+
+
+def _partials_table(partials):
+    """
+    Concatenate the partials into one table
+
+    Args:
+        partials: a seq. of 2D arrays with columns [time freq amp phase bw]
+
+    Returns:
+        a tuple (bps, offsets), where bps is a C-contiguous float64 array with
+        the columns [time freq amp phase bw] of all partials and the breakpoints
+        of partial i are `bps[offsets[i]:offsets[i+1]]`
+    """
+    cdef list matrices = partials if isinstance(partials, list) else list(partials)
+    offsets = np.zeros((len(matrices) + 1,), dtype=np.intp)
+    if not matrices:
+        return np.zeros((0, 5), dtype='float64'), offsets
+    np.cumsum([len(m) for m in matrices], out=offsets[1:])
+    bps = np.ascontiguousarray(np.concatenate(matrices)[:, :5], dtype='float64')
+    return bps, offsets
+
+
+def _partials_eval_table(const double[:, ::1] bps, const Py_ssize_t[::1] offsets, times,
+                         bint extend=False, bint sparse=False, bint phase=False,
+                         int workers=1, dtype='float64'):
+    """
+    partials_eval for partials already concatenated via _partials_table
+    """
+    cdef Py_ssize_t numpartials = offsets.shape[0] - 1
+    cdef const double[::1] ts = np.ascontiguousarray(times, dtype='float64')
+    cdef Py_ssize_t numtimes = ts.shape[0]
+    cdef const int[::1] cols = np.array([1, 2, 3, 4] if phase else [1, 2, 4], dtype=np.intc)
+    cdef Py_ssize_t numcols = cols.shape[0]
+    cdef double[:, :, ::1] dense64
+    cdef float[:, :, ::1] dense32
+    cdef double[:, ::1] data64
+    cdef float[:, ::1] data32
+    cdef Py_ssize_t[::1] firstrow, dataoffsets
+    cdef Py_ssize_t i
+    dtype = np.dtype(dtype)
+    if dtype != np.float64 and dtype != np.float32:
+        raise ValueError(f"dtype should be float64 or float32, got {dtype}")
+    cdef bint single = dtype == np.float32
+
+    if not sparse:
+        out = np.zeros((numcols, numtimes, numpartials), dtype=dtype)
+        if single:
+            dense32 = out
+        else:
+            dense64 = out
+
+        def evalchunk(Py_ssize_t first, Py_ssize_t last):
+            with nogil:
+                if single:
+                    _eval_partials(bps, offsets, ts, cols, first, last, extend, dense32)
+                else:
+                    _eval_partials(bps, offsets, ts, cols, first, last, extend, dense64)
+
+        _run_chunks(evalchunk, numpartials, workers)
+        return tuple(out)
+
+    firstrow = np.zeros((numpartials,), dtype=np.intp)
+    dataoffsets = np.zeros((numpartials + 1,), dtype=np.intp)
+    for i in range(numpartials):
+        if offsets[i] < offsets[i+1]:
+            firstrow[i] = _bisect_left(ts, bps[offsets[i], 0])
+            dataoffsets[i+1] = dataoffsets[i] + _bisect_right(ts, bps[offsets[i+1]-1, 0]) - firstrow[i]
+        else:
+            dataoffsets[i+1] = dataoffsets[i]
+    data = np.empty((dataoffsets[numpartials], numcols), dtype=dtype)
+    if single:
+        data32 = data
+    else:
+        data64 = data
+
+    def evalchunk_sparse(Py_ssize_t first, Py_ssize_t last):
+        with nogil:
+            if single:
+                _eval_partials_sparse(bps, offsets, ts, cols, firstrow, dataoffsets, first, last, data32)
+            else:
+                _eval_partials_sparse(bps, offsets, ts, cols, firstrow, dataoffsets, first, last, data64)
+
+    _run_chunks(evalchunk_sparse, numpartials, workers)
+    return np.asarray(firstrow), np.asarray(dataoffsets), data
+
+
+def partials_eval(partials, times, bint extend=False, bint sparse=False, bint phase=False,
+                  int workers=1, dtype='float64'):
+    """
+    Evaluate all partials at the given times
+
+    Each partial is interpolated linearly between its breakpoints in one
+    merged sweep over its breakpoints and the times.
+
+    Args:
+        partials: a seq. of 2D arrays with columns [time freq amp phase bw]
+        times: the times to evaluate the partials at. Must be sorted
+        extend: if True, a partial evaluated outside of its time range
+            takes the values of its first / last breakpoint. Otherwise
+            all values are 0 outside the partial
+        sparse: if True, only the times at which each partial is defined
+            are evaluated (see below)
+        phase: if True, phases are evaluated too
+        workers: if > 1, the partials are split between this number
+            of threads
+        dtype: the dtype of the output, float64 or float32. Interpolation is
+            always performed in double precision
+
+    Returns:
+        if `sparse` is False, a tuple `(freqs, amps, bws)` (`(freqs, amps, phases, bws)`
+        if `phase` is True) where each item is a 2D array of shape
+        (numtimes, numpartials). If `sparse` is True, a tuple
+        `(firstrow, offsets, data)`, where `data` is a 2D array with
+        columns freq, amp, [phase], bw. The values of partial `i` are
+        `data[offsets[i]:offsets[i+1]]`, corresponding to the times
+        `times[firstrow[i]:firstrow[i] + offsets[i+1] - offsets[i]]`
+
+    ### Example
+
+    ```python
+
+    import loristrck as lt
+    import numpy as np
+    partials, labels = lt.read_sdif(...)
+    times = np.arange(0, 10, 0.01)
+    freqs, amps, bws = lt.partials_eval(partials, times)
+    ```
+    """
+    bps, offsets = _partials_table(partials)
+    return _partials_eval_table(bps, offsets, times, extend=extend, sparse=sparse,
+                                phase=phase, workers=workers, dtype=dtype)
+
+
+cdef double _kth_largest(double *xs, Py_ssize_t n, Py_ssize_t k) noexcept nogil:
+    """
+    The k-th largest value (k starting at 1) of xs. xs is reordered in place
+    """
+    cdef Py_ssize_t lo = 0, hi = n - 1, i, j
+    cdef Py_ssize_t target = k - 1
+    cdef double pivot, tmp
+    while lo < hi:
+        pivot = xs[(lo + hi) >> 1]
+        i, j = lo, hi
+        while i <= j:
+            while xs[i] > pivot:
+                i += 1
+            while xs[j] < pivot:
+                j -= 1
+            if i <= j:
+                tmp = xs[i]; xs[i] = xs[j]; xs[j] = tmp
+                i += 1
+                j -= 1
+        if target <= j:
+            hi = j
+        elif target >= i:
+            lo = i
+        else:
+            break
+    return xs[target]
+
+
+cdef void _limit_rows(floating[:, :] amps, Py_ssize_t maxactive, double factor,
+                      unsigned char[::1] kept, double *scores, double *work) noexcept nogil:
+    cdef Py_ssize_t numrows = amps.shape[0], numcols = amps.shape[1]
+    cdef Py_ssize_t r, j, numactive, numequal
+    cdef double threshold
+    for r in range(numrows):
+        numactive = 0
+        for j in range(numcols):
+            if amps[r, j] > 0:
+                numactive += 1
+        if numactive > maxactive:
+            # select among the active partials only
+            numactive = 0
+            for j in range(numcols):
+                scores[j] = amps[r, j]
+                if scores[j] > 0:
+                    if kept[j]:
+                        scores[j] *= factor
+                    work[numactive] = scores[j]
+                    numactive += 1
+            threshold = _kth_largest(work, numactive, maxactive)
+            # the number of scores equal to the threshold which can still be kept
+            numequal = maxactive
+            for j in range(numcols):
+                if scores[j] > threshold:
+                    numequal -= 1
+            for j in range(numcols):
+                if scores[j] > threshold:
+                    continue
+                if scores[j] == threshold and numequal > 0:
+                    numequal -= 1
+                    continue
+                amps[r, j] = 0
+        for j in range(numcols):
+            kept[j] = amps[r, j] > 0
+
+
+def _limit_active(amps, int maxactive, double hysteresis=0., state=None):
+    """
+    Zero all but the `maxactive` loudest amplitudes of each row, in place
+
+    Args:
+        amps: a 2D float64 or float32 array (can be a strided view) of shape
+            (numrows, numpartials)
+        maxactive: the max. number of non-zero amplitudes per row
+        hysteresis: an amplitude bonus, in dB, given to the partials kept
+            in the previous row. A partial needs to be this much louder than
+            a kept partial in order to replace it
+        state: the state returned by a previous call, to continue over
+            consecutive chunks of rows
+
+    Returns:
+        the state after the last row (which partials were kept)
+    """
+    cdef Py_ssize_t numcols = amps.shape[1]
+    cdef unsigned char[::1] kept = (np.zeros((numcols,), dtype=np.uint8) if state is None
+                                    else state)
+    cdef double factor = 10 ** (hysteresis / 20.)
+    cdef double[::1] scores = np.empty((numcols,), dtype='float64')
+    cdef double[::1] work = np.empty((numcols,), dtype='float64')
+    cdef double[:, :] amps64
+    cdef float[:, :] amps32
+    if maxactive <= 0 or numcols == 0:
+        return np.asarray(kept)
+    if amps.dtype == np.float32:
+        amps32 = amps
+        with nogil:
+            _limit_rows(amps32, maxactive, factor, kept, &scores[0], &work[0])
+    else:
+        amps64 = amps
+        with nogil:
+            _limit_rows(amps64, maxactive, factor, kept, &scores[0], &work[0])
+    return np.asarray(kept)
+
+
 cdef inline _np.ndarray EMPTY2D(int numrows, int numcols):
     cdef _np.npy_intp *dims = [numrows, numcols]
     return _np.PyArray_EMPTY(2, dims, _np.NPY_DOUBLE, 0)
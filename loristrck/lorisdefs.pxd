@@ -63,11 +63,18 @@ cdef extern from "../src/loris/src/PartialList.h" namespace "Loris":
         
 
 
+ctypedef void (*SampleReader)(void* data, long start, long count, double* out) noexcept nogil
+
 cdef extern from "../src/loris/src/Analyzer.h" namespace "Loris":
     cppclass Analyzer "Loris::Analyzer":
         Analyzer(double resolution, double window_width)
         void configure( double resolution, double window_width )
         PartialList analyze( double* buffer, double* buffend, double srate)
+        void analyze( SampleReader reader, void* data, long numSamples, double srate) nogil
+        void analyzePeaks( SampleReader reader, void* data, long numSamples, double srate) nogil
+        const vector[double]& peakData()
+        const vector[long]& peakFrames()
+        void trackPeaks(const double* rows, long rowSize, const long* frames, long numFrames) nogil
         PartialList & partials()
         void setHopTime( double )
         void setFreqDrift( double )
@@ -80,11 +87,23 @@ cdef extern from "../src/loris/src/Analyzer.h" namespace "Loris":
         double sidelobeLevel()
         void storeResidueBandwidth( double regionWidth )
         void storeConvergenceBandwidth( double tolerance )
+        void setSilenceGate( double marginDb )
+        void setFreqFloor( double x )
+        double freqFloor()
+        void setFreqCeiling( double x )
+        long gatedFrames()
+
+cdef extern from "../src/loris/src/Oscillator.h" namespace "Loris":
+    cdef enum NoiseMode "Loris::Oscillator::NoiseMode":
+        ExactNoise "Loris::Oscillator::ExactNoise"
+        SharedNoise "Loris::Oscillator::SharedNoise"
 
 cdef extern from "../src/loris/src/Synthesizer.h" namespace "Loris":
     cppclass Synthesizer "Loris::Synthesizer":
         Synthesizer(double srate, vector[double] &buffer, double fadeTime)
         void synthesize( Partial p )
+        NoiseMode noiseMode()
+        void setNoiseMode( NoiseMode mode )
     
 cdef extern from "../src/loris/src/SdifFile.h" namespace "Loris":
     cppclass SdifFile "Loris::SdifFile":
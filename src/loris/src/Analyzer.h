@@ -252,6 +252,74 @@ public:
     void analyze( const double * bufBegin, const double * bufEnd, double srate,
                   const Envelope & reference );
     
+//  -- analysis of samples read on demand --
+
+    //! A SampleReader writes count samples, starting at the sample
+    //! index start, to out, converting them to double. data is the
+    //! pointer given to analyze.
+    typedef void ( * SampleReader )( void * data, long start, long count, double * out );
+
+    //! Analyze numSamples (mono) samples at the given sample rate
+    //! (in Hz), reading them in blocks with reader as the analysis 
+    //! window advances, and store the extracted Partials in the 
+    //! Analyzer's PartialList (std::list of Partials). Only one block
+    //! of samples is held in memory at any time.
+    //! 
+    //! \param  reader is the function used to read the samples
+    //! \param  data is passed to reader 
+    //! \param  numSamples is the number of samples to analyze
+    //! \param  srate is the sample rate of the samples
+    void analyze( SampleReader reader, void * data, long numSamples, double srate );
+
+    //! Analyze numSamples (mono) samples read on demand, using the
+    //! specified envelope as a frequency reference for Partial tracking.
+    //! 
+    //! \param  reader is the function used to read the samples
+    //! \param  data is passed to reader 
+    //! \param  numSamples is the number of samples to analyze
+    //! \param  srate is the sample rate of the samples
+    //! \param  reference is an Envelope having the approximate
+    //!         frequency contour expected of the resulting Partials.
+    void analyze( SampleReader reader, void * data, long numSamples, double srate,
+                  const Envelope & reference );
+
+//  -- peak analysis --
+
+    //! Analyze numSamples (mono) samples read on demand, like analyze,
+    //! without forming Partials. The spectral peaks retained in each
+    //! frame (after thinning and bandwidth association) are stored
+    //! instead, see peakData and peakFrames. The PartialList is left 
+    //! empty.
+    //! 
+    //! \param  reader is the function used to read the samples
+    //! \param  data is passed to reader 
+    //! \param  numSamples is the number of samples to analyze
+    //! \param  srate is the sample rate of the samples
+    void analyzePeaks( SampleReader reader, void * data, long numSamples, double srate );
+
+    //! Return the peaks stored by analyzePeaks, as rows of five values:
+    //! time (seconds), frequency (Hz), amplitude, phase and bandwidth.
+    //! The peaks of each frame are sorted by increasing frequency.
+    const std::vector< double > & peakData( void ) const;
+
+    //! Return the index of the first row of each frame in peakData, 
+    //! followed by the total number of rows.
+    const std::vector< long > & peakFrames( void ) const;
+
+    //! Form Partials from the peaks of consecutive frames, as stored by
+    //! analyzePeaks, and store them in the Analyzer's PartialList. Only
+    //! the Partial formation parameters (frequency drift, phase correction)
+    //! are used, the result is the same as the one of analyze, given the 
+    //! same parameters. 
+    //! 
+    //! \param  rows points to the peaks, each a row of rowSize values
+    //!         starting with time, frequency, amplitude, phase and bandwidth
+    //! \param  rowSize is the number of values per row (at least 5)
+    //! \param  frames holds the index of the first row of each frame, 
+    //!         followed by the total number of rows 
+    //! \param  numFrames is the number of frames
+    void trackPeaks( const double * rows, long rowSize, const long * frames, long numFrames );
+
 //  -- parameter access --
 
     //! Return the amplitude floor (lowest detected spectral amplitude),            
@@ -271,6 +339,10 @@ public:
     //! Return the frequency floor (minimum instantaneous Partial               
     //! frequency), in Hz, for this Analyzer.               
     double freqFloor( void ) const;
+
+    //! Return the frequency ceiling (maximum instantaneous Partial               
+    //! frequency), in Hz, for this Analyzer, or zero if there is none.               
+    double freqCeiling( void ) const;
 	
 	//! Return the frequency resolution (minimum instantaneous frequency        
 	//! difference between Partials) for this Analyzer at the specified
@@ -332,6 +404,14 @@ public:
     //! \param x is the new value of this parameter.            
     void setFreqFloor( double x );
 
+    //! Set the frequency ceiling (maximum instantaneous Partial                  
+    //! frequency), in Hz, for this Analyzer. Spectral peaks above
+    //! the ceiling are discarded before peak selection. Zero 
+    //! (the default) means no ceiling.
+    //! 
+    //! \param x is the new value of this parameter.            
+    void setFreqCeiling( double x );
+
     //! Set the frequency resolution (minimum instantaneous frequency       
     //! difference between Partials) for this Analyzer. (Does not cause     
     //! other parameters to be recomputed.)                                     
@@ -456,6 +536,36 @@ public:
         }
            
 
+//  -- silence gate --
+
+    //! Skip the spectral analysis of frames which are too quiet to 
+    //! contain any peak above the amplitude floor. The level of a frame 
+    //! is the sum of its absolute samples weighted by the (scaled) 
+    //! analysis window, which bounds the magnitude of any spectral peak 
+    //! in that frame. A frame is gated if its level is below the amplitude 
+    //! floor minus the margin. A gated frame is treated as a frame without 
+    //! peaks, so Partials end there as they would otherwise. 
+    //!
+    //! \param marginDb is the margin (in dB) below the amplitude floor.
+    //! With a margin of zero or more, gating does not change the result
+    //! of the analysis. A negative margin gates more frames, at the cost
+    //! of losing the quietest peaks.
+    void setSilenceGate( double marginDb = 0 );
+    
+    //! Analyze all frames (default).
+    void disableSilenceGate( void );
+    
+    //! Return true if this Analyzer skips silent frames.
+    bool gateSilence( void ) const;
+    
+    //! Return the margin (dB) of the silence gate.
+    double silenceGateMargin( void ) const;
+    
+    //! Return the number of frames skipped by the silence gate 
+    //! in the last analysis.
+    long gatedFrames( void ) const;
+
+
 //  -- PartialList access --
 
     //! Return a mutable reference to this Analyzer's list of 
@@ -534,6 +644,9 @@ private:
     double m_freqFloor;         //!  lowest frequency (Hz) component extracted
                                 //!  in spectral analysis
     
+    double m_freqCeiling;       //!  highest frequency (Hz) component extracted
+                                //!  in spectral analysis, or zero if unlimited
+    
     double m_freqDrift;         //!  the maximum frequency (Hz) difference between two 
                                 //!  consecutive Breakpoints that will be linked to
                                 //!  form a Partial
@@ -557,8 +670,18 @@ private:
                                 
     bool m_phaseCorrect;        //!  flag indicating that phases/frequencies should be
                                 //!  made consistent at the end of the analysis
+
+    bool m_gateSilence;         //!  flag indicating that silent frames are not analyzed
+    
+    double m_gateMargin;        //!  in dB, margin below the amplitude floor under
+                                //!  which a frame is considered silent
+    
+    long m_gatedFrames;         //!  number of frames skipped in the last analysis
                             
     PartialList m_partials;     //!  collect Partials here
+    
+    std::vector< double > m_peakData;   //!  peaks stored by analyzePeaks, five values per peak
+    std::vector< long > m_peakFrames;   //!  first peak of each frame in m_peakData
         
     //! builder object for constructing a fundamental frequency
     //! estimate during analysis
@@ -612,6 +735,14 @@ private:
     //  to the stored mixed phase derivative. Otherwise, the
     //  Peak bandwidth is set to zero.
     void fixBandwidth( Peaks & peaks );
+    
+    //  The frame loop of analyze and analyzePeaks. If track is false,
+    //  the peaks of each frame are stored instead of forming Partials.
+    void analyzeFrames( SampleReader reader, void * data, long numSamples, double srate,
+                        const Envelope & reference, bool track );
+    
+    //  Append the peaks of a frame to the stored peaks.
+    void storePeaks( Peaks & peaks, double frameTime );
                     
 };  //  end of class Analyzer
 
@@ -139,6 +139,15 @@ public:
     //! \sa apply
     double operator() ( double input ) { return apply(input); }    
 
+    //! Filter a block of samples in place. The result is identical
+    //! to calling apply() on each sample of the range in turn, but
+    //! the delay line is kept in contiguous storage while the
+    //! block is processed.
+    //!
+    //!	\param begin is the beginning of the range of samples to filter
+    //!	\param end is the end of the range of samples to filter
+    void apply( double * begin, double * end );
+
 //  --- access/mutation ---
 
 	//!	Provide access to the numerator (feed-forward) coefficients
@@ -186,6 +195,10 @@ private:
     //! filter gain (applied to output)
     double m_gain;      
 
+    //! flat copy of the delay line used by the block apply(), 
+    //! kept to avoid an allocation on every call (not copied)
+    std::vector< double > m_blockline;
+
 };  //  end of class Filter
 
 
@@ -77,6 +77,16 @@ public:
 	//!	\sa sample
 	double operator() ( void ) 	{ return sample(); }
 	
+	//	fill
+	//
+	//!	Fill the half-open range of doubles with new samples of Gaussian
+	//!	noise. The samples are the same as those returned by successive
+	//!	calls to sample().
+	//!
+	//!	\param begin is the beginning of the range to fill
+	//!	\param end is the end of the range to fill
+	void fill( double * begin, double * end );
+	
 
 //	--- implementation ---
 private:
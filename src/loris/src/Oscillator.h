@@ -36,6 +36,8 @@
 #include "NoiseGenerator.h"
 #include "Filter.h"
 
+#include <vector>
+
 //  begin namespace
 namespace Loris {
 
@@ -56,11 +58,36 @@ class Breakpoint;
 //
 class Oscillator
 {
+public:
+    //! Strategies for computing the filtered noise that modulates
+    //! bandwidth-enhanced (noisy) Partials.
+    //!
+    //! - ExactNoise: one Gaussian sample is generated and filtered for
+    //!   every output sample (the original Loris implementation).
+    //! - SharedNoise: a table of filtered noise is computed once per
+    //!   Oscillator and shared by all the Partials it renders, each
+    //!   Partial reading it from a different (pseudo-random) offset
+    //!   to decorrelate the modulation of simultaneous Partials. The
+    //!   noise has the same distribution and spectrum as ExactNoise,
+    //!   but it is periodic, with a period of SharedNoiseLength samples.
+    enum NoiseMode { ExactNoise = 0, SharedNoise = 1 };
+    
+    //! Length (in samples) of the table used in SharedNoise mode.
+    //! Must be a power of two.
+    enum { SharedNoiseLength = 1 << 17 };
+
+private:
 //  --- implementation ---
 
     NoiseGenerator m_modulator;     //! stochastic modulator
     Filter m_filter;                //! filter applied to the noise generator
     
+    NoiseMode m_noisemode;          //! how the filtered noise is computed
+    std::vector< double > m_noisebuf;   //! filtered noise for the current segment
+    std::vector< double > m_noisetable; //! shared filtered noise (SharedNoise mode)
+    unsigned long m_noisepos;       //! read position in the shared noise table
+    unsigned long m_noiseoffset;    //! state used to choose the read offsets
+    
     //  instantaneous oscillator state:
     double m_instfrequency;         //! radians per sample
     double m_instamplitude;         //! absolute amplitude
@@ -122,7 +149,18 @@ public:
     
     //! Return access to the Filter used by this oscillator to 
     //! implement bandwidth-enhanced sinusoidal synthesis.
-    Filter & filter( void ) { return m_filter; }
+    //! (Any shared noise table computed with the previous
+    //! filter is discarded).
+    Filter & filter( void ) { m_noisetable.clear(); return m_filter; }
+    
+    //! Return the strategy used to compute the filtered noise.
+    NoiseMode noiseMode( void ) const { return m_noisemode; }
+    
+    //! Set the strategy used to compute the filtered noise
+    //! for bandwidth-enhanced Partials.
+    //!
+    //! \param mode ExactNoise or SharedNoise
+    void setNoiseMode( NoiseMode mode );
     
 // --- static members ---
 
@@ -130,6 +168,12 @@ public:
     //! to use in Oscillator construction. Eventually, allow
     //! external (client) specification of the Filter prototype.
     static const Filter & prototype_filter( void );
+
+private:
+
+    //! Copy filtered noise samples from the shared noise table
+    //! into the half-open range (SharedNoise mode).
+    void fillNoise( double * begin, double * end );
      
 };  //  end of class Oscillator
 
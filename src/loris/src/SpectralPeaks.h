@@ -69,6 +69,7 @@ public:
     double amplitude( void ) const { return m_breakpoint.amplitude(); }
     double frequency( void ) const { return m_breakpoint.frequency(); }
     double bandwidth( void ) const { return m_breakpoint.bandwidth(); }
+    double phase( void ) const { return m_breakpoint.phase(); }
     
     //  --- mutation ---
     
@@ -244,6 +244,18 @@ public:
 	//! filter coefficients.)
 	Filter & filter( void );
 	
+	//! Return the strategy used by this Synthesizer's Oscillator
+	//! to compute the noise modulating bandwidth-enhanced Partials.
+	Oscillator::NoiseMode noiseMode( void ) const;
+	
+	//! Set the strategy used by this Synthesizer's Oscillator
+	//! to compute the noise modulating bandwidth-enhanced Partials.
+	//!
+	//! \sa Oscillator::NoiseMode
+	//!
+	//!	\param	mode The new noise mode.
+	void setNoiseMode( Oscillator::NoiseMode mode );
+	
 
 //	-- parameters structure --
 
@@ -0,0 +1,47 @@
+"""
+Benchmark for analyze_channels
+
+A multichannel signal is built from a sound file (each channel a shifted copy)
+and analyzed channel by channel with analyze and at once with analyze_channels.
+Both results must be identical. The labelled output is written to SDIF and
+the labels read back must be the channel of each partial
+"""
+import loristrck as lt
+import numpy as np
+import argparse
+import time
+import os
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--sndfile', default=os.path.join(os.path.dirname(__file__), "sound/finneganswake-fragm01-1.flac"))
+parser.add_argument('--channels', default=4, type=int)
+parser.add_argument('--dur', default=20, type=float)
+args = parser.parse_args()
+
+samples, sr = lt.util.sndreadmono(args.sndfile, 0)
+samples = np.resize(samples, int(args.dur * sr))
+multi = np.stack([np.roll(samples, i * 1000) for i in range(args.channels)], axis=1)
+print(f"Input: {args.channels} channels, {args.dur} secs, {os.cpu_count()} cpus")
+
+t0 = time.time()
+serial = [lt.analyze(np.ascontiguousarray(multi[:, i]), sr, resolution=40)
+          for i in range(args.channels)]
+print(f"analyze per channel: {time.time() - t0:.2f} secs")
+
+t0 = time.time()
+parallel = lt.analyze_channels(multi, sr, resolution=40)
+print(f"analyze_channels:    {time.time() - t0:.2f} secs")
+
+for ps1, ps2 in zip(serial, parallel):
+    assert len(ps1) == len(ps2)
+    assert all(np.array_equal(p1, p2) for p1, p2 in zip(ps1, ps2))
+
+partials, labels = lt.analyze_channels(multi[:sr*2], sr, resolution=40, labelled=True)
+outfile = 'bench-channels.sdif'
+lt.write_sdif(partials, outfile, labels=labels)
+channelof = {(p[0, 0], p[0, 1], p[0, 2], label): label for p, label in zip(partials, labels)}
+partials2, labels2 = lt.read_sdif(outfile)
+assert sorted(set(labels2)) == list(range(args.channels))
+assert all((p[0, 0], p[0, 1], p[0, 2], label) in channelof for p, label in zip(partials2, labels2))
+os.remove(outfile)
+print("OK")
@@ -0,0 +1,46 @@
+"""
+Benchmark for the input types of analyze
+
+The samples of a sound file are tiled to --dur seconds and converted to
+int16. They are analyzed directly and as a float64 copy (what was needed
+before analyze accepted other types). Both analyses must be identical.
+The peak memory allocated by numpy (traced via tracemalloc) and the time
+of each are reported
+"""
+import loristrck as lt
+import numpy as np
+import argparse
+import tracemalloc
+import time
+import os
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--sndfile', default=os.path.join(os.path.dirname(__file__), "sound/finneganswake-fragm01-1.flac"))
+parser.add_argument('--dur', default=60, type=float)
+args = parser.parse_args()
+
+samples, sr = lt.util.sndreadmono(args.sndfile, 0)
+numsamples = int(args.dur * sr)
+samples = np.resize(samples, numsamples)
+pcm = np.round(samples * 32767).astype(np.int16)
+del samples
+print(f"Input: {args.dur} secs, int16 ({pcm.nbytes/1e6:.1f} MB)")
+
+
+def run(func):
+    tracemalloc.start()
+    t0 = time.time()
+    partials = func()
+    dt = time.time() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return partials, dt, peak
+
+
+direct, dt, peak = run(lambda: lt.analyze(pcm, sr, resolution=40))
+print(f"int16:           {dt:.2f} secs, peak {peak/1e6:.1f} MB")
+copied, dt, peak = run(lambda: lt.analyze(pcm.astype(float) / 32768, sr, resolution=40))
+print(f"float64 copy:    {dt:.2f} secs, peak {peak/1e6:.1f} MB")
+assert len(direct) == len(copied)
+assert all(np.array_equal(p1, p2) for p1, p2 in zip(direct, copied))
+print("OK")
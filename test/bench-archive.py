@@ -0,0 +1,80 @@
+"""
+Benchmark for the loristrck archive format
+
+Each file is analyzed (or read, if it is a .sdif file) and saved as RBEP
+SDIF and as an archive with each storage option. The archives are checked
+against the original partials (the breakpoint times read back must be
+strictly increasing) and the size and load time of each format
+are reported. PartialArchive.between is checked against a linear search
+"""
+import loristrck as lt
+from loristrck import util
+import numpy as np
+import argparse
+import tempfile
+import time
+import os
+
+here = os.path.dirname(__file__)
+parser = argparse.ArgumentParser()
+parser.add_argument('files', nargs='*', default=[os.path.join(here, "sound/finneganswake-fragm01-1.flac"),
+                                                  os.path.join(here, "sound/tuning-fork--A4.sdif")])
+parser.add_argument('--repeat', default=5, type=int)
+args = parser.parse_args()
+
+
+def timeit(func, repeat=args.repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.time()
+        out = func()
+        best = min(best, time.time() - t0)
+    return best, out
+
+
+tmpdir = tempfile.mkdtemp()
+for path in args.files:
+    if path.endswith('.sdif'):
+        partials, labels = lt.read_sdif(path)
+    else:
+        samples, sr = util.sndreadmono(path, 0)
+        partials = lt.analyze(samples, sr, resolution=40)
+        labels = [0] * len(partials)
+    numbps = sum(len(p) for p in partials)
+    print(f"\n{os.path.basename(path)}: {len(partials)} partials, {numbps} breakpoints")
+    print(f"{'format':24} {'size (MB)':>10} {'load (ms)':>10} {'columnar (ms)':>14} {'max. error':>12}")
+    sdifpath = os.path.join(tmpdir, 'out.sdif')
+    lt.write_sdif(partials, sdifpath)
+    # The first read builds the frame index, read_sdif is timed with it cached
+    dt, (sdifpartials, _) = timeit(lambda: lt.read_sdif(sdifpath))
+    print(f"{'sdif (RBEP)':24} {os.path.getsize(sdifpath)/1e6:10.2f} {dt*1000:10.1f} {'-':>14}")
+    for dtype in ('float64', 'float32', 'float16'):
+        for timedelta in (False, True):
+            archivepath = os.path.join(tmpdir, 'out.ltrk')
+            util.write_archive(partials, archivepath, labels=labels, dtype=dtype, timedelta=timedelta)
+            dt, (read, readlabels) = timeit(lambda: util.read_archive(archivepath))
+            dtcolumnar, ((table, offsets), _) = timeit(lambda: util.read_archive(archivepath, columnar=True))
+            assert readlabels == labels
+            assert np.array_equal(np.concatenate(read), table)
+            assert len(read) == len(partials)
+            assert all((np.diff(p[:, 0]) > 0).all() for p in read)
+            if dtype == 'float64' and not timedelta:
+                assert all(np.array_equal(p1, p2) for p1, p2 in zip(partials, read))
+            err = max(np.abs(p1 - p2).max() for p1, p2 in zip(partials, read))
+            name = f"archive {dtype}" + (" +delta" if timedelta else "")
+            print(f"{name:24} {os.path.getsize(archivepath)/1e6:10.2f} {dt*1000:10.1f} {dtcolumnar*1000:14.1f} {err:12.3g}")
+            os.remove(archivepath)
+    os.remove(sdifpath)
+    util.write_archive(partials, archivepath, metadata={'sr': np.int64(44100), 'gain': np.float32(0.5)})
+    archive = util.PartialArchive(archivepath)
+    assert archive.metadata == {'sr': 44100, 'gain': 0.5}
+    starts = np.array([p[0, 0] for p in partials])
+    ends = np.array([p[-1, 0] for p in partials])
+    for t0 in np.linspace(starts.min() - 1, ends.max() + 1, 23):
+        for t1 in (t0, t0 + 0.1, t0 + 2):
+            expected = np.nonzero((starts <= t1) & (ends >= t0))[0]
+            assert np.array_equal(archive.between(t0, t1), expected)
+    del archive
+    os.remove(archivepath)
+os.rmdir(tmpdir)
+print("OK")
@@ -0,0 +1,41 @@
+"""
+Benchmark for the silence gate of analyze
+
+A sound file is cut in chunks of --chunk seconds, separated by the same
+duration of very quiet noise (--noisedb). The signal is analyzed with and
+without gate=0, both results must be identical
+"""
+import loristrck as lt
+import numpy as np
+import argparse
+import logging
+import time
+import os
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--sndfile', default=os.path.join(os.path.dirname(__file__), "sound/finneganswake-fragm01-1.flac"))
+parser.add_argument('--chunk', default=2, type=float)
+parser.add_argument('--noisedb', default=-120, type=float)
+args = parser.parse_args()
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+samples, sr = lt.util.sndreadmono(args.sndfile, 0)
+rng = np.random.default_rng(0)
+chunksize = int(args.chunk * sr)
+noiseamp = lt.util.db2amp(args.noisedb)
+parts = []
+for i in range(0, len(samples), chunksize):
+    parts.append(samples[i:i+chunksize])
+    parts.append(rng.normal(0, noiseamp, chunksize))
+samples = np.concatenate(parts)
+print(f"Input: {len(samples)/sr:.1f} secs, half of it at {args.noisedb} dB")
+
+t0 = time.time()
+partials = lt.analyze(samples, sr, resolution=40)
+print(f"no gate: {time.time() - t0:.2f} secs")
+t0 = time.time()
+gated = lt.analyze(samples, sr, resolution=40, gate=0)
+print(f"gate=0:  {time.time() - t0:.2f} secs")
+assert len(partials) == len(gated)
+assert all(np.array_equal(p1, p2) for p1, p2 in zip(partials, gated))
+print("OK")
@@ -0,0 +1,62 @@
+"""
+Benchmark for analyze(..., maxfreq=)
+
+A harmonic tone with vibrato, whose partials are all below --maxfreq, is
+mixed with noise and sinusoids above it. It is analyzed at the full
+sampling rate and with maxfreq (decimated). The breakpoints below maxfreq
+are compared to the known frequencies and amplitudes of the tone.
+"""
+import loristrck as lt
+import numpy as np
+import argparse
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--sr', default=48000, type=int)
+parser.add_argument('--dur', default=10, type=float)
+parser.add_argument('--maxfreq', default=4000, type=float)
+parser.add_argument('--f0', default=110, type=float)
+args = parser.parse_args()
+
+sr = args.sr
+t = np.arange(int(args.dur * sr)) / sr
+vibrato = 1 + 0.02 * np.sin(2 * np.pi * 5 * t)
+f0 = args.f0 * vibrato
+phase0 = 2 * np.pi * np.cumsum(f0) / sr
+numharmonics = int(args.maxfreq * 0.9 / (args.f0 * 1.02))
+samples = sum(0.3 / k * np.sin(k * phase0) for k in range(1, numharmonics + 1))
+rng = np.random.default_rng(0)
+# content above maxfreq: some partials and highpassed noise
+for f in rng.uniform(args.maxfreq * 1.2, sr / 2 * 0.95, 10):
+    samples += 0.05 * np.sin(2 * np.pi * f * t)
+noise = rng.normal(0, 0.02, len(t))
+spectrum = np.fft.rfft(noise)
+spectrum[:int(len(spectrum) * args.maxfreq * 1.2 / (sr / 2))] = 0
+samples += np.fft.irfft(spectrum, len(t))
+print(f"Input: {args.dur} secs at {sr} Hz, {numharmonics} harmonics below {args.maxfreq} Hz")
+
+
+def accuracy(partials):
+    """ Frequency (Hz) and amplitude (dB) errors of the breakpoints of the tone """
+    bps = np.vstack(partials)
+    bps = bps[(bps[:, 1] < args.maxfreq) & (bps[:, 2] > 0.001)]
+    f0s = args.f0 * (1 + 0.02 * np.sin(2 * np.pi * 5 * bps[:, 0]))
+    k = np.clip(np.round(bps[:, 1] / f0s), 1, numharmonics)
+    ferr = np.abs(bps[:, 1] - k * f0s)
+    aerr = np.abs(20 * np.log10(bps[:, 2] / (0.3 / k)))
+    return len(bps), np.median(ferr), np.percentile(ferr, 95), np.median(aerr)
+
+
+def run(label, **kws):
+    t0 = time.time()
+    partials = lt.analyze(samples, sr, resolution=args.f0 * 0.8, **kws)
+    dt = time.time() - t0
+    numbps, fmed, f95, amed = accuracy(partials)
+    print(f"{label:18s} {dt:6.2f} secs, {numbps} breakpoints below maxfreq, freq. error "
+          f"median {fmed:.3f} Hz / 95% {f95:.3f} Hz, amp. error median {amed:.3f} dB")
+    return dt
+
+
+tfull = run("full rate")
+tdecim = run(f"maxfreq={args.maxfreq:g}", maxfreq=args.maxfreq)
+print(f"Speedup: {tfull / tdecim:.1f}x")
@@ -0,0 +1,47 @@
+"""
+Benchmark for analyze_multires
+
+A sound file is analyzed with analyze_multires, with a fine resolution for
+the low band and coarser ones above, and with analyze using the fine
+resolution over the whole spectrum. A multiresolution analysis with only
+one band must be identical to analyze, and a steady tone exactly at the
+edge between two bands must result in only one partial
+"""
+import loristrck as lt
+import numpy as np
+import argparse
+import logging
+import time
+import os
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--sndfile', default=os.path.join(os.path.dirname(__file__), "sound/finneganswake-fragm01-1.flac"))
+parser.add_argument('--workers', default=0, type=int)
+args = parser.parse_args()
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+samples, sr = lt.util.sndreadmono(args.sndfile, 0)
+bands = [(0, 1000, 40, -1), (1000, 4000, 80, -1), (4000, 0, 160, -1)]
+
+t0 = time.time()
+partials = lt.analyze(samples, sr, resolution=40)
+print(f"analyze: {time.time() - t0:.2f} secs, {len(partials)} partials")
+t0 = time.time()
+multires = lt.analyze_multires(samples, sr, bands=bands, workers=args.workers)
+print(f"analyze_multires: {time.time() - t0:.2f} secs, {len(multires)} partials")
+assert all(np.all(np.diff(p[:, 0]) > 0) for p in multires)
+
+single = lt.analyze_multires(samples, sr, bands=[(0, 0, 40, -1)])
+partials.sort(key=lambda p: p[0, 0])
+assert len(partials) == len(single)
+assert all(np.array_equal(p1, p2) for p1, p2 in zip(partials, single))
+
+# a tone at the edge is found by both bands, it should be kept only once
+sr = 44100
+times = np.arange(int(sr * 3)) / sr
+tone = 0.5 * np.sin(2 * np.pi * 1000 * times)
+partials = lt.analyze_multires(tone, sr, bands=[(0, 1000, 40, -1), (1000, 0, 120, -1)])
+atedge = [p for p in partials if np.any(np.abs(p[:, 1] - 1000) < 60)]
+print(f"tone at the edge: {len(atedge)} partials, {[len(p) for p in atedge]} breakpoints")
+assert len(atedge) == 1
+print("OK")
@@ -0,0 +1,77 @@
+"""
+Benchmark for pack
+
+The analysis of a sound file is tiled in time until the number of partials
+reaches --numpartials, then packed with the 'optimal' and 'greedy' methods.
+Both the time to assign the partials to tracks and the number of tracks
+are reported. With maxtracks, pack must discard the partials the greedy
+method leaves out, following the given order
+"""
+import loristrck as lt
+from loristrck import util
+import numpy as np
+import argparse
+import time
+import os
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--sndfile', default=os.path.join(os.path.dirname(__file__), "sound/finneganswake-fragm01-1.flac"))
+parser.add_argument('--numpartials', default=100000, type=int)
+parser.add_argument('--join', action='store_true', help="Also join the tracks (time the full pack)")
+args = parser.parse_args()
+
+samples, sr = lt.util.sndreadmono(args.sndfile, 0)
+partials = [p for p in lt.analyze(samples, sr, resolution=40) if len(p) >= 2]
+dur = len(samples) / sr
+tiled = []
+offset = 0.
+while len(tiled) < args.numpartials:
+    for p in partials:
+        p2 = p.copy()
+        p2[:, 0] += offset
+        tiled.append(p2)
+    offset += dur
+partials = tiled[:args.numpartials]
+print(f"Partials: {len(partials)}")
+
+clearance = 0.010 + 2 * 0.005
+
+
+def check(tracks):
+    numpartials = 0
+    for track in tracks:
+        numpartials += len(track)
+        for p0, p1 in zip(track, track[1:]):
+            assert p1[0, 0] > p0[-1, 0] + clearance
+    assert numpartials == len(partials)
+
+
+t0 = time.time()
+tracks, _ = util._pack_optimal(partials, clearance, maxtracks=0)
+print(f"optimal: {time.time() - t0:.3f} secs, {len(tracks)} tracks")
+check(tracks)
+
+# the max. number of simultaneous partials (including clearance) is a lower bound
+events = sorted([(p[0, 0], 1) for p in partials] + [(p[-1, 0] + clearance, -1) for p in partials])
+maxsimultaneous = max(np.cumsum([e[1] for e in events]))
+assert len(tracks) == maxsimultaneous, (len(tracks), maxsimultaneous)
+
+t0 = time.time()
+tracks, _ = util._pack_greedy(partials, clearance, acceptabledist=0.1, maxtracks=0)
+print(f"greedy: {time.time() - t0:.3f} secs, {len(tracks)} tracks")
+check(tracks)
+
+# with maxtracks the default method is 'greedy': which partials are discarded
+# depends on the given order, as it always did
+subset = partials[:5000]
+_, unpacked = util.pack(subset, maxtracks=20)
+_, expected = util._pack_greedy(subset, 0.010 + 2 * min(0.005, 0.010 / 3), acceptabledist=0.1, maxtracks=20)
+assert unpacked and [id(p) for p in unpacked] == [id(p) for p in expected]
+print(f"pack(maxtracks=20): {len(unpacked)} of {len(subset)} partials discarded")
+
+if args.join:
+    for method in ('optimal', 'greedy'):
+        t0 = time.time()
+        tracks, _ = util.pack(partials, method=method)
+        print(f"pack(method='{method}'): {time.time() - t0:.3f} secs")
+print("OK")
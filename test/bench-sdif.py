@@ -0,0 +1,102 @@
+"""
+Benchmark for read_sdif
+
+An analysis is tiled in time --repeat times and saved as RBEP. The file is
+then read with the native reader (read_sdif) and with loris' own SdifFile.
+Both results are compared and the throughput of each is reported in MB/s.
+Finally a 5 second window is read, using the frame index built by the
+first read, and checked against the full read. iter_sdif is checked
+against read_sdif and its peak memory is reported. Malformed files must
+raise ValueError
+"""
+import loristrck as lt
+from loristrck import _core
+import numpy as np
+import argparse
+import gc
+import tracemalloc
+import time
+import os
+import struct
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--sndfile', default=os.path.join(os.path.dirname(__file__), "sound/finneganswake-fragm01-1.flac"))
+parser.add_argument('--repeat', default=10, type=int)
+parser.add_argument('--outfile', default='bench.sdif')
+args = parser.parse_args()
+
+samples, sr = lt.util.sndreadmono(args.sndfile, 0)
+partials = lt.analyze(samples, sr, resolution=40)
+dur = len(samples) / sr
+tiled = []
+for i in range(args.repeat):
+    for p in partials:
+        p2 = p.copy()
+        p2[:, 0] += i * dur
+        tiled.append(p2)
+lt.write_sdif(tiled, args.outfile)
+megabytes = os.path.getsize(args.outfile) / 1e6
+print(f"{args.outfile}: {megabytes:.1f} MB, {len(tiled)} partials")
+
+t0 = time.time()
+partials1, labels1 = lt.read_sdif(args.outfile)
+dt1 = time.time() - t0
+print(f"read_sdif: {dt1:.3f} secs, {megabytes/dt1:.1f} MB/s")
+
+t0 = time.time()
+partials2, labels2 = _core._read_sdif_loris(args.outfile)
+dt2 = time.time() - t0
+print(f"loris SdifFile: {dt2:.3f} secs, {megabytes/dt2:.1f} MB/s")
+
+assert labels1 == labels2
+assert len(partials1) == len(partials2)
+assert all(np.array_equal(p1, p2) for p1, p2 in zip(partials1, partials2))
+
+t0, t1 = dur * args.repeat / 2, dur * args.repeat / 2 + 5
+cropped = [p[(p[:, 0] >= t0) & (p[:, 0] <= t1)] for p in partials1]
+cropped = [p for p in cropped if len(p)]
+del partials1, partials2
+gc.collect()
+start = time.time()
+partials3, labels3 = lt.read_sdif(args.outfile, t0=t0, t1=t1)
+print(f"read_sdif (t0={t0:.1f}, t1={t1:.1f}): {time.time() - start:.3f} secs, {len(partials3)} partials")
+assert len(cropped) == len(partials3)
+assert all(np.array_equal(p1, p2) for p1, p2 in zip(cropped, partials3))
+del partials3, cropped
+gc.collect()
+partials4, labels4 = lt.read_sdif(args.outfile)
+ends = {(p[-1, 0], p[-1, 1], len(p)): p for p in partials4}
+start = time.time()
+numbreakpoints = sum(len(p) for p, label in lt.iter_sdif(args.outfile))
+dt = time.time() - start
+assert numbreakpoints == sum(len(p) for p in partials4)
+tracemalloc.start()
+for p, label in lt.iter_sdif(args.outfile):
+    assert np.array_equal(ends.pop((p[-1, 0], p[-1, 1], len(p))), p)
+peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+assert not ends
+print(f"iter_sdif: {dt:.3f} secs, peak memory {peak/1e6:.1f} MB")
+os.remove(args.outfile)
+
+# malformed files: a frame size which does not advance, a frame running past
+# the end of the file, a matrix with a negative number of rows
+header = b'SDIF' + struct.pack('>II', 8, 3) + bytes(4)
+frametail = struct.pack('>dii', 0., 0, 1)
+malformed = [
+    header + b'1NVT' + struct.pack('>i', -8) + frametail,
+    header + b'1NVT' + struct.pack('>i', 1000) + frametail,
+    header + b'RBEP' + struct.pack('>i', 32) + frametail + b'RBEP' + struct.pack('>Iii', 8, -1, 6)
+]
+for data in malformed:
+    with open(args.outfile, 'wb') as f:
+        f.write(data)
+    for read in (lt.read_sdif, lambda path: list(lt.iter_sdif(path))):
+        try:
+            read(args.outfile)
+        except ValueError as e:
+            print(f"malformed file: {e}")
+        else:
+            raise AssertionError("A malformed SDIF file should raise ValueError")
+os.remove(args.outfile)
+print("OK")
@@ -0,0 +1,83 @@
+"""
+Benchmark for SharedPartials
+
+The analysis of a sound file is tiled in time until the number of partials
+reaches --numpartials. A pool of workers then runs select, partials_sample
+and synthesize over a time slice of the partials, first with the partials
+pickled to each task and then attached via shared memory. Both results
+must be equal
+"""
+import loristrck as lt
+from loristrck import util
+import numpy as np
+import multiprocessing as mp
+import argparse
+import time
+import os
+
+
+def work(partials, t0, t1):
+    partials = util.partials_between(partials, t0, t1)
+    selected, _ = util.select(partials, minamp=-60, minbps=2)
+    freqs, amps, bws = util.partials_sample(selected, dt=0.01, t0=t0, t1=t1, maxactive=64,
+                                            interleave=False)
+    samples = lt.synthesize(selected, 44100, start=t0, end=t1)
+    return len(selected), float(amps.sum()), float(np.abs(samples).sum())
+
+
+def work_pickled(args):
+    partials, t0, t1 = args
+    return work(partials, t0, t1)
+
+
+def work_shared(args):
+    shared, t0, t1 = args
+    return work(shared.partials, t0, t1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sndfile', default=os.path.join(os.path.dirname(__file__), "sound/finneganswake-fragm01-1.flac"))
+    parser.add_argument('--numpartials', default=100000, type=int)
+    parser.add_argument('--numtasks', default=16, type=int)
+    parser.add_argument('--workers', default=4, type=int)
+    args = parser.parse_args()
+
+    samples, sr = util.sndreadmono(args.sndfile, 0)
+    partials = lt.analyze(samples, sr, resolution=40)
+    dur = len(samples) / sr
+    tiled = []
+    offset = 0.
+    while len(tiled) < args.numpartials:
+        for p in partials:
+            p2 = p.copy()
+            p2[:, 0] += offset
+            tiled.append(p2)
+        offset += dur
+    partials = tiled[:args.numpartials]
+    end = partials[-1][0, 0]
+    print(f"Partials: {len(partials)}, duration: {end:.1f} secs")
+    slices = [(t, t + 0.5) for t in np.linspace(0, end - 0.5, args.numtasks)]
+
+    for method in ('fork', 'spawn'):
+        if method not in mp.get_all_start_methods():
+            continue
+        ctx = mp.get_context(method)
+        with ctx.Pool(args.workers) as pool:
+            # warm up the workers
+            pool.map(abs, range(args.workers))
+            t0 = time.time()
+            pickled = pool.map(work_pickled, [(partials, a, b) for a, b in slices], chunksize=1)
+            tpickled = time.time() - t0
+            t0 = time.time()
+            with util.SharedPartials(partials) as shared:
+                tcreate = time.time() - t0
+                results = pool.map(work_shared, [(shared, a, b) for a, b in slices], chunksize=1)
+            tshared = time.time() - t0
+        assert pickled == results, (pickled, results)
+        print(f"{method}: pickled {tpickled:.2f} secs, shared {tshared:.2f} secs (publish: {tcreate:.3f} secs)")
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark for sndreadmono
+
+A multichannel file is generated and one channel is read with sndreadmono
+and with soundfile.read (reading all channels and extracting one, the way
+sndreadmono used to do it). Each read runs in its own process so that its
+peak memory can be measured. The samples read must be identical. Reading
+a mono file ignores the channel
+"""
+import numpy as np
+import argparse
+import subprocess
+import sys
+import os
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--outfile', default='bench-sndread.wav')
+parser.add_argument('--channels', default=8, type=int)
+parser.add_argument('--dur', default=120, type=float)
+parser.add_argument('--sr', default=96000, type=int)
+parser.add_argument('--subtype', default='PCM_24')
+parser.add_argument('--run', choices=['sndreadmono', 'soundfile'])
+args = parser.parse_args()
+
+chan = args.channels // 2
+if args.run:
+    import resource
+    import time
+    import soundfile
+    import loristrck as lt
+    t0 = time.time()
+    if args.run == 'sndreadmono':
+        samples, sr = lt.util.sndreadmono(args.outfile, chan, start=args.dur/4, end=args.dur*3/4)
+    else:
+        samples, sr = soundfile.read(args.outfile)
+        samples = np.ascontiguousarray(samples[:, chan])
+        samples = samples[int(round(args.dur/4*sr)):int(round(args.dur*3/4*sr))]
+    dt = time.time() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    np.save(args.outfile + f'.{args.run}.npy', samples)
+    print(f"{args.run}: {dt:.2f} secs, peak memory {peak:.0f} MB")
+    sys.exit(0)
+
+import soundfile
+numframes = int(args.dur * args.sr)
+with soundfile.SoundFile(args.outfile, 'w', samplerate=args.sr, channels=args.channels,
+                         subtype=args.subtype) as f:
+    t = np.arange(args.sr) / args.sr
+    for i in range(0, numframes, args.sr):
+        block = np.sin(2*np.pi*(100*np.arange(1, args.channels + 1))*(t[:, None] + i / args.sr)) * 0.5
+        f.write(block[:numframes - i])
+size = os.path.getsize(args.outfile)
+print(f"{args.outfile}: {args.channels} channels, {args.dur} secs, {args.sr} Hz, "
+      f"{args.subtype}, {size/1e6:.0f} MB")
+results = []
+for run in ('sndreadmono', 'soundfile'):
+    subprocess.run([sys.executable, __file__, '--outfile', args.outfile, '--channels', str(args.channels),
+                    '--dur', str(args.dur), '--sr', str(args.sr), '--run', run], check=True)
+    results.append(np.load(args.outfile + f'.{run}.npy'))
+    os.remove(args.outfile + f'.{run}.npy')
+assert np.array_equal(*results)
+os.remove(args.outfile)
+
+# chan is ignored for a mono file
+import loristrck as lt
+monofile = args.outfile + '.mono.wav'
+soundfile.write(monofile, np.linspace(-0.5, 0.5, 1000), args.sr)
+assert np.array_equal(lt.util.sndreadmono(monofile, 3)[0], lt.util.sndreadmono(monofile, 0)[0])
+os.remove(monofile)
+print("OK")
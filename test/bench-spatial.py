@@ -0,0 +1,113 @@
+"""
+Benchmark for PartialGrid
+
+The analysis of a sound file is tiled in time until the number of partials
+reaches --numpartials. Box and nearest-neighbour queries are checked against
+a brute force scan over all partials and both are timed. The memory used by
+the index of two short partials one hour apart must not depend on the time
+x frequency extent of the grid
+"""
+import loristrck as lt
+from loristrck.util import PartialGrid
+import numpy as np
+import argparse
+import math
+import time
+import tracemalloc
+import os
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--sndfile', default=os.path.join(os.path.dirname(__file__), "sound/finneganswake-fragm01-1.flac"))
+parser.add_argument('--numpartials', default=100000, type=int)
+parser.add_argument('--numqueries', default=200, type=int)
+args = parser.parse_args()
+
+samples, sr = lt.util.sndreadmono(args.sndfile, 0)
+partials = lt.analyze(samples, sr, resolution=40)
+dur = len(samples) / sr
+tiled = []
+offset = 0.
+while len(tiled) < args.numpartials:
+    for p in partials:
+        p2 = p.copy()
+        p2[:, 0] += offset
+        tiled.append(p2)
+    offset += dur
+partials = tiled[:args.numpartials]
+print(f"Partials: {len(partials)}, duration: {offset:.1f} secs")
+
+t0 = time.time()
+grid = PartialGrid(partials)
+print(f"Build: {time.time() - t0:.3f} secs")
+
+
+def box_brute(t0, t1, f0, f1):
+    out = []
+    for i, p in enumerate(partials):
+        if p[0, 0] > t1 or p[-1, 0] < t0:
+            continue
+        if len(p) == 1:
+            ts = [p[0, 0]]
+        else:
+            ts = np.concatenate(([max(t0, p[0, 0])], p[(p[:, 0] > t0) & (p[:, 0] < t1), 0],
+                                 [min(t1, p[-1, 0])]))
+        fs = np.interp(ts, p[:, 0], p[:, 1])
+        if fs.max() >= f0 and fs.min() <= f1:
+            out.append(i)
+    return np.array(out, dtype=int)
+
+
+def nearest_brute(t, f):
+    best, bestdist = -1, math.inf
+    for i, p in enumerate(partials):
+        ts, fs = p[:, 0] / grid.timeres, p[:, 1] / grid.freqres
+        if len(p) == 1:
+            d = math.hypot(t / grid.timeres - ts[0], f / grid.freqres - fs[0])
+        else:
+            dt, df = np.diff(ts), np.diff(fs)
+            pt, pf = t / grid.timeres - ts[:-1], f / grid.freqres - fs[:-1]
+            lensq = dt*dt + df*df
+            u = np.clip(np.divide(pt*dt + pf*df, lensq, out=np.zeros_like(lensq), where=lensq > 0), 0, 1)
+            d = np.hypot(pt - u*dt, pf - u*df).min()
+        if d < bestdist:
+            best, bestdist = i, d
+    return best, bestdist
+
+
+rng = np.random.default_rng(0)
+boxes = [(t, t + rng.uniform(0.01, 0.5), f, f + rng.uniform(10, 1000))
+         for t, f in zip(rng.uniform(0, offset, args.numqueries), rng.uniform(0, 8000, args.numqueries))]
+points = list(zip(rng.uniform(0, offset, args.numqueries), rng.uniform(0, 8000, args.numqueries)))
+
+t0 = time.time()
+results = [grid.box(*b) for b in boxes]
+tgrid = time.time() - t0
+numcheck = 10
+t0 = time.time()
+for b, res in zip(boxes[:numcheck], results):
+    assert np.array_equal(box_brute(*b), res), b
+tbrute = (time.time() - t0) / numcheck * len(boxes)
+print(f"box:     grid {tgrid/len(boxes)*1000:.3f} ms/query, brute force {tbrute/len(boxes)*1000:.1f} ms/query")
+
+t0 = time.time()
+results = [grid.nearest(t, f) for t, f in points]
+tgrid = time.time() - t0
+t0 = time.time()
+for (t, f), (idx, dist) in zip(points[:numcheck], results):
+    bidx, bdist = nearest_brute(t, f)
+    assert abs(bdist - dist) < 1e-9, (t, f, idx, dist, bidx, bdist)
+tbrute = (time.time() - t0) / numcheck * len(points)
+print(f"nearest: grid {tgrid/len(points)*1000:.3f} ms/query, brute force {tbrute/len(points)*1000:.1f} ms/query")
+
+sparse = [np.array([[0., 100., 0.1, 0., 0.], [0.1, 100., 0.1, 0., 0.]]),
+          np.array([[3600., 20000., 0.1, 0., 0.], [3600.1, 20000., 0.1, 0., 0.]])]
+tracemalloc.start()
+grid = PartialGrid(sparse)
+peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+print(f"sparse grid: {grid.numtimecells}x{grid.numfreqcells} cells, peak memory {peak/1e3:.1f} KB")
+assert peak < 1e6
+assert list(grid.box(0, 1, 0, 200)) == [0] and list(grid.box(3599, 3601, 19000, 21000)) == [1]
+assert len(grid.box(10, 3000, 0, 30000)) == 0
+assert grid.nearest(0.05, 120)[0] == 0 and grid.nearest(3600.05, 19900)[0] == 1
+print("OK")
@@ -0,0 +1,32 @@
+"""
+Benchmark for track
+
+The peaks of a sound file are analyzed once and tracked with different
+values of freqdrift. Each result must be identical to analyze with the
+same freqdrift
+"""
+import loristrck as lt
+import numpy as np
+import argparse
+import time
+import os
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--sndfile', default=os.path.join(os.path.dirname(__file__), "sound/finneganswake-fragm01-1.flac"))
+parser.add_argument('--resolution', default=40, type=float)
+args = parser.parse_args()
+
+samples, sr = lt.util.sndreadmono(args.sndfile, 0)
+t0 = time.time()
+peaks, offsets = lt.analyze_peaks(samples, sr, resolution=args.resolution)
+print(f"analyze_peaks: {time.time() - t0:.2f} secs, {len(peaks)} peaks")
+for freqdrift in (args.resolution * 0.25, args.resolution * 0.5, args.resolution * 0.75):
+    t0 = time.time()
+    partials = lt.analyze(samples, sr, resolution=args.resolution, freqdrift=freqdrift)
+    t1 = time.time()
+    tracked = lt.track(peaks, offsets, freqdrift=freqdrift)
+    t2 = time.time()
+    print(f"freqdrift={freqdrift}: analyze {t1 - t0:.2f} secs, track {t2 - t1:.2f} secs")
+    assert len(partials) == len(tracked)
+    assert all(np.array_equal(p1, p2) for p1, p2 in zip(partials, tracked))
+print("OK")
@@ -0,0 +1,93 @@
+"""
+Test for read_aiff
+
+AIFF files are written with soundfile (8, 16, 24 and 32 bit, mono and
+multichannel) and read with read_aiff, which must return the same samples
+as soundfile, also when reading a range of frames or a subset of the
+channels. A truncated file returns the complete frames it holds, and
+malformed files raise ValueError
+"""
+import loristrck as lt
+import numpy as np
+import soundfile
+import tempfile
+import os
+
+rng = np.random.default_rng(0)
+sr = 44100
+numframes = 10000
+tmpdir = tempfile.mkdtemp()
+path = os.path.join(tmpdir, "test.aif")
+
+for subtype in ('PCM_S8', 'PCM_16', 'PCM_24', 'PCM_32'):
+    for numchannels in (1, 2, 5):
+        data = rng.uniform(-1, 1, (numframes, numchannels))
+        soundfile.write(path, data, sr, format='AIFF', subtype=subtype)
+        expected, expectedsr = soundfile.read(path, dtype='float64', always_2d=True)
+        samples, samplerate = lt.read_aiff(path)
+        assert samplerate == expectedsr
+        if numchannels == 1:
+            assert samples.shape == (numframes,)
+            samples = samples[:, None]
+        assert np.array_equal(samples, expected), (subtype, numchannels)
+        # ranges
+        for start, end in ((0, 1), (100, 2000), (numframes - 10, 0), (500, numframes * 2)):
+            stop = numframes if end <= 0 else min(end, numframes)
+            samples, _ = lt.read_aiff(path, start=start, end=end, channels=list(range(numchannels)))
+            assert np.array_equal(samples, expected[start:stop]), (subtype, start, end)
+        # channels, as int (numpy ints included) or list
+        last = numchannels - 1
+        for chan in (0, last, np.int64(last)):
+            samples, _ = lt.read_aiff(path, start=10, end=110, channels=chan)
+            assert samples.shape == (100,)
+            assert np.array_equal(samples, expected[10:110, chan])
+        chans = [last, 0]
+        samples, _ = lt.read_aiff(path, channels=chans)
+        assert np.array_equal(samples, expected[:, chans])
+        try:
+            lt.read_aiff(path, channels=numchannels)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("A channel out of range should raise ValueError")
+    print(f"{subtype}: OK")
+
+# truncated file: only the complete frames are read
+data = rng.uniform(-1, 1, (numframes, 2))
+soundfile.write(path, data, sr, format='AIFF', subtype='PCM_24')
+expected, _ = soundfile.read(path, dtype='float64')
+with open(path, 'rb') as f:
+    raw = f.read()
+truncated = os.path.join(tmpdir, "truncated.aif")
+with open(truncated, 'wb') as f:
+    f.write(raw[:len(raw) - 1000])
+samples, _ = lt.read_aiff(truncated)
+assert 0 < len(samples) < numframes
+assert np.array_equal(samples, expected[:len(samples)])
+print(f"truncated: OK, {len(samples)} of {numframes} frames")
+
+# malformed files
+ssnd = raw.index(b'SSND')
+comm = raw.index(b'COMM')
+malformed = {
+    'empty': b'',
+    'not aiff': b'RIFF' + raw[4:],
+    'no sound data': raw[:ssnd],
+    'header only': raw[:12],
+    # 12 bit samples
+    'bad sample size': raw[:comm + 14] + b'\x00\x0c' + raw[comm + 16:],
+}
+for name, data in malformed.items():
+    with open(truncated, 'wb') as f:
+        f.write(data)
+    try:
+        lt.read_aiff(truncated)
+    except ValueError as e:
+        print(f"{name}: {e}")
+    else:
+        raise AssertionError(f"{name}: a malformed file should raise ValueError")
+
+os.remove(path)
+os.remove(truncated)
+os.rmdir(tmpdir)
+print("OK")
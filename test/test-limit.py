@@ -0,0 +1,63 @@
+"""
+Test for the limiting of active partials (maxactive / hysteresis)
+
+_core._limit_active is checked against an argsort reference, for float64
+and float32 and for strided views, and the chunked output of
+partials_sample_chunks with hysteresis is checked against the output
+of partials_sample
+"""
+import loristrck as lt
+from loristrck import _core
+import numpy as np
+import argparse
+import os
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--sndfile', default=os.path.join(os.path.dirname(__file__), "sound/finneganswake-fragm01-1.flac"))
+args = parser.parse_args()
+
+
+def limit_reference(amps, maxactive, hysteresis=0.):
+    factor = 10 ** (hysteresis / 20.)
+    kept = np.zeros(amps.shape[1], dtype=bool)
+    for row in amps:
+        if np.count_nonzero(row > 0) > maxactive:
+            scores = np.where(kept, row * factor, row)
+            # ties are resolved in favour of the first column
+            drop = np.argsort(-scores, kind='stable')[maxactive:]
+            row[drop] = 0
+        kept = row > 0
+
+
+rng = np.random.default_rng(0)
+for dtype in ('float64', 'float32'):
+    for hysteresis in (0., 3.):
+        amps = rng.uniform(0, 1, (500, 60)).astype(dtype)
+        amps[rng.uniform(0, 1, amps.shape) < 0.4] = 0
+        # quantize to produce ties
+        amps[:250] = np.round(amps[:250] * 8) / 8
+        expected = amps.copy()
+        limit_reference(expected, 12, hysteresis)
+        # a strided view, as used for interleaved matrices
+        m = np.zeros((amps.shape[0], amps.shape[1] * 3), dtype=dtype)
+        m[:, 1::3] = amps
+        _core._limit_active(m[:, 1::3], 12, hysteresis=hysteresis)
+        assert np.array_equal(m[:, 1::3], expected), (dtype, hysteresis)
+        assert not m[:, 0::3].any() and not m[:, 2::3].any()
+        assert (np.count_nonzero(m, axis=1) <= 12).all()
+print("limit_active: OK")
+
+samples, sr = lt.util.sndreadmono(args.sndfile, 0)
+partials = lt.analyze(samples, sr, resolution=60)
+tracks, _ = lt.util.pack(partials)
+for interleave in (True, False):
+    whole = lt.util.partials_sample(tracks, dt=0.005, maxactive=20, hysteresis=3,
+                                    interleave=interleave)
+    chunks = list(lt.util.partials_sample_chunks(tracks, dt=0.005, maxactive=20, hysteresis=3,
+                                                 chunksize=37, interleave=interleave))
+    if interleave:
+        assert np.array_equal(whole, np.vstack(chunks))
+    else:
+        for i, mtx in enumerate(whole):
+            assert np.array_equal(mtx, np.vstack([chunk[i] for chunk in chunks]))
+print("partials_sample_chunks: OK")
@@ -0,0 +1,76 @@
+"""
+Round trip test for MtxFile
+
+Matrices are written with matrix_save, matrix_save_chunks and MtxFile (32
+and 64 bits, with and without metadata) and read back with MtxFile. Data,
+numeric header and metadata (including strings with commas, colons
+and quotes) must survive the round trip, and the file must
+be readable as a wav file by soundfile. Appending beyond the 4 GB limit of
+RIFF must raise ValueError
+"""
+import loristrck as lt
+from loristrck.util import MtxFile
+import numpy as np
+import soundfile
+import tempfile
+import os
+
+rng = np.random.default_rng(0)
+tmpdir = tempfile.mkdtemp()
+path = os.path.join(tmpdir, "test.mtx")
+metadata = {'dt': 0.0014512471655328798, 'title': 'a, b:c', 'maxActive': 30, 'empty': '',
+            'source': 'voice.sdif', 'note': "it's, 'quoted'"}
+
+for bits in (32, 64):
+    dtype = 'float32' if bits == 32 else 'float64'
+    for meta in (None, metadata):
+        data = rng.uniform(-1, 1, (1001, 7)).astype(dtype)
+        lt.util.matrix_save(data, path, bits=bits, metadata=meta)
+        mtx = MtxFile(path)
+        assert mtx.numrows == 1001 and mtx.numcols == 7 and mtx.bits == bits
+        assert np.array_equal(mtx.data, data)
+        numericmeta = [v for v in (meta or {}).values() if not isinstance(v, str)]
+        assert np.allclose(mtx.header, [3 + len(numericmeta), 1001, 7] + numericmeta)
+        for key, value in (meta or {}).items():
+            if isinstance(value, str):
+                assert mtx.metadata[key] == value
+            else:
+                assert abs(mtx.metadata[key] - value) <= abs(value) * 1e-11, (key, mtx.metadata[key])
+        # a .mtx file is a mono float wav file: the header followed by the data
+        samples, _ = soundfile.read(path, dtype=dtype)
+        assert np.array_equal(samples[:len(mtx.header)], mtx.header.astype(dtype))
+        assert np.array_equal(samples[len(mtx.header):], data.ravel())
+        del mtx
+
+        # chunks, with a last chunk shorter than the others
+        chunks = [data[i:i+100] for i in range(0, len(data), 100)]
+        lt.util.matrix_save_chunks(iter(chunks), path, numrows=len(data), numcols=7,
+                                   bits=bits, metadata=meta)
+        assert np.array_equal(MtxFile(path).data, data)
+    print(f"{bits} bits: OK")
+
+# 1D data is saved as one column
+data = rng.uniform(-1, 1, 500)
+lt.util.matrix_save(data, path, bits=64)
+assert MtxFile(path).data.shape == (500, 1)
+assert np.array_equal(MtxFile(path).data[:, 0], data)
+
+# empty matrix
+with MtxFile(path, 'w', numcols=3) as mtx:
+    pass
+assert MtxFile(path).data.shape == (0, 3)
+
+# appending beyond 4 GB, without allocating the rows
+with MtxFile(path, 'w', numcols=2**28, bits=64) as mtx:
+    huge = np.broadcast_to(np.zeros((1, 2**28)), (3, 2**28))
+    try:
+        mtx.append(huge)
+    except ValueError as e:
+        print(f"4 GB limit: {e}")
+    else:
+        raise AssertionError("Appending beyond 4 GB should raise ValueError")
+assert MtxFile(path).numrows == 0
+
+os.remove(path)
+os.rmdir(tmpdir)
+print("OK")
@@ -0,0 +1,29 @@
+"""
+Test for select
+
+A sound file is analyzed and util.select is checked against a plain loop
+over the partials. A partial with any breakpoint above maxfreq (or below
+minfreq) must be discarded. Before PartialStats, the max. frequency of
+each partial was computed as -inf and no partial was ever dropped by maxfreq
+"""
+import loristrck as lt
+import numpy as np
+import os
+
+sndfile = os.path.join(os.path.dirname(__file__), "sound/finneganswake-fragm01-1.flac")
+samples, sr = lt.util.sndreadmono(sndfile, 0)
+partials = lt.analyze(samples, sr, resolution=40)
+
+for minfreq, maxfreq in [(0, 5000), (0, 1000), (200, 24000), (300, 3000)]:
+    selected, unselected = lt.util.select(partials, minfreq=minfreq, maxfreq=maxfreq)
+    assert len(selected) + len(unselected) == len(partials)
+    assert selected and unselected
+    assert all(minfreq <= p[:, 1].min() and p[:, 1].max() <= maxfreq for p in selected)
+    assert all(p[:, 1].min() < minfreq or p[:, 1].max() > maxfreq for p in unselected)
+    print(f"minfreq={minfreq}, maxfreq={maxfreq}: {len(selected)} selected, {len(unselected)} discarded")
+
+stats = lt.util.PartialStats(partials)
+above = [i for i, p in enumerate(partials) if p[:, 1].max() > 5000]
+assert above
+assert not set(above) & set(stats.select(maxfreq=5000)[0].tolist())
+print("OK")